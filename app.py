@@ -1,13 +1,23 @@
-from flask import Flask, request, jsonify, send_file, render_template
-import matplotlib
-matplotlib.use('Agg')  # Set the backend before importing pyplot
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+from flask import Flask, Response, g, request, jsonify, send_file, render_template, url_for
 from datetime import datetime, timedelta
-import numpy as np
+import os
+import atexit
+from concurrent.futures import as_completed
 import io
+import json
 import base64
+import hashlib
 import logging # Added for better debugging
+from scheduler import (parse_plan, parse_holidays, parse_weekly_holiday, compute_schedule, schedule_summary, task_to_json,
+                       plan_to_payload, parse_prior_dates, apply_changes, reschedule_incremental,
+                       schedule_batch_chunk, CircularDependencyError)
+from work_calendar import get_work_calendar
+from render_service import RenderService, RenderQueueFull, RenderTimeout
+from render_cache import LRUCache, RenderCache, plan_fingerprint
+from render_jobs import JobManager, DirectoryJobBackend
+from project_store import ProjectStore, check_project_id
+from renderer import render_tile, tile_row_count, tile_rows
+from metrics import TimelineMetrics, WORKER_PHASES, server_timing_header, timed
 
 logging.basicConfig(level=logging.INFO)
 
@@ -15,10 +25,91 @@ app = Flask(__name__,
             static_folder='static',
             template_folder='templates')
 
+# --- Render Cache (in-memory LRU, optional disk tier) ---
+render_cache = RenderCache(
+    max_entries=int(os.environ.get('RENDER_CACHE_ENTRIES', 128)),
+    disk_dir=os.environ.get('RENDER_CACHE_DIR') or None,
+    disk_max_bytes=int(os.environ.get('RENDER_CACHE_DISK_BYTES', 256 * 1024 * 1024)),
+)
+
+# --- Metrics (Prometheus text at /metrics, optional Server-Timing header) ---
+timeline_metrics = TimelineMetrics()
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+
+# --- Render Workers (process pool, bounded queue) ---
+render_service = RenderService(
+    workers=int(os.environ.get('RENDER_WORKERS', os.cpu_count() or 1)),
+    queue_size=int(os.environ.get('RENDER_QUEUE_SIZE', 8)),
+    timeout=float(os.environ.get('RENDER_TIMEOUT', 60)),
+    on_timings=timeline_metrics.observe_phases, # plot/savefig of every render, jobs included
+)
+atexit.register(render_service.shutdown)
+
+# --- Render Jobs (results kept for RENDER_JOB_TTL seconds) ---
+job_manager = JobManager(
+    render_service,
+    render_cache,
+    backend=DirectoryJobBackend(os.environ['RENDER_JOBS_DIR']) if os.environ.get('RENDER_JOBS_DIR') else None,
+    ttl=float(os.environ.get('RENDER_JOB_TTL', 600)),
+)
+
+# --- Project Store (saved plans, schedules and images in SQLite) ---
+project_store = ProjectStore(
+    os.environ.get('PROJECT_STORE_PATH', 'projects.sqlite3'),
+    keep_versions=int(os.environ.get('PROJECT_STORE_VERSIONS', 10)),
+)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+
+# --- Request Instrumentation ---
+@app.before_request
+def start_request_timings():
+    g.timings = {}
+    g.plan_size = None
+
+
+@app.after_request
+def record_request_metrics(response):
+    if request.endpoint in (None, 'metrics', 'static'):
+        return response
+    timings = g.get('timings') or {}
+    # Worker phases were already recorded by the render service
+    timeline_metrics.observe_phases(timings, exclude=WORKER_PHASES)
+    timeline_metrics.observe_request(request.endpoint, response.status_code, g.get('plan_size'))
+    if SERVER_TIMING and timings:
+        response.headers['Server-Timing'] = server_timing_header(timings)
+    return response
+
+
+def parse_request_plan(data):
+    """ ``parse_plan`` with the parse phase timed and the plan size kept for metrics. """
+    with timed(g.timings, 'parse'):
+        plan = parse_plan(data)
+    g.plan_size = (len(plan['tasks']), len(plan['holidays']))
+    logging.info(f"Timeline request: {g.plan_size[0]} tasks, {g.plan_size[1]} holidays")
+    return plan
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """ Per-process metrics in the Prometheus text format. """
+    cache_lines = [
+        '# HELP timeline_render_cache_hits_total Render cache hits.',
+        '# TYPE timeline_render_cache_hits_total counter',
+        f'timeline_render_cache_hits_total {render_cache.hits}',
+        '# HELP timeline_render_cache_misses_total Render cache misses.',
+        '# TYPE timeline_render_cache_misses_total counter',
+        f'timeline_render_cache_misses_total {render_cache.misses}',
+    ]
+    return Response(timeline_metrics.render(cache_lines), mimetype='text/plain; version=0.0.4')
+
+def _weekly_off_days(weekly_holiday):
+    """ The weekly holiday setting (one day or a list of days) as a set of weekdays. """
+    return {weekly_holiday} if isinstance(weekly_holiday, int) else set(weekly_holiday)
+
 # --- Helper Function to Calculate End Date ---
 def calculate_end_date(start, duration, holidays, weekly_holiday):
     """
@@ -27,10 +118,11 @@ def calculate_end_date(start, duration, holidays, weekly_holiday):
         start (datetime): The start date of the task.
         duration (int): The duration of the task in working days (must be >= 1).
         holidays (list): A list of holiday dictionaries [{'start': dt, 'end': dt}, ...].
-        weekly_holiday (int): The day of the week to skip (0=Monday, 6=Sunday).
+        weekly_holiday (int | list): The day(s) of the week to skip (0=Monday, 6=Sunday).
     Returns:
         datetime: The calculated end date.
     """
+    weekly_off = _weekly_off_days(weekly_holiday)
     if duration <= 0: # Duration includes the start day
         # Handle zero or negative duration if needed, or raise error
         # For now, assume duration is at least 1
@@ -41,7 +133,7 @@ def calculate_end_date(start, duration, holidays, weekly_holiday):
 
     # First, check if the start date itself is a holiday or weekly off day
     is_start_holiday = any(h['start'] <= start <= h['end'] for h in holidays)
-    is_start_weekly_off = start.weekday() == weekly_holiday
+    is_start_weekly_off = start.weekday() in weekly_off
 
     # If start day is valid, it counts as day 1
     if not is_start_holiday and not is_start_weekly_off:
@@ -51,7 +143,7 @@ def calculate_end_date(start, duration, holidays, weekly_holiday):
     while days_added < duration:
         end_date += timedelta(days=1)
         is_holiday = any(h['start'] <= end_date <= h['end'] for h in holidays)
-        is_weekly_off = end_date.weekday() == weekly_holiday
+        is_weekly_off = end_date.weekday() in weekly_off
 
         if not is_holiday and not is_weekly_off:
             days_added += 1
@@ -61,362 +153,796 @@ def calculate_end_date(start, duration, holidays, weekly_holiday):
 # --- Helper Function to find next working day ---
 def find_next_working_day(start_date, holidays, weekly_holiday):
     """ Finds the next valid working day starting from start_date (inclusive). """
+    weekly_off = _weekly_off_days(weekly_holiday)
     current_date = start_date
     while True:
         is_holiday = any(h['start'] <= current_date <= h['end'] for h in holidays)
-        is_weekly_off = current_date.weekday() == weekly_holiday
+        is_weekly_off = current_date.weekday() in weekly_off
         if not is_holiday and not is_weekly_off:
             return current_date
         current_date += timedelta(days=1)
 
 
+# --- Cached Rendering (shared by generate and download) ---
+def _not_modified(etag):
+    """ True if the client already holds the response identified by ``etag``. """
+    return request.if_none_match.contains(etag)
+
+
+def _not_modified_response(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def render_busy_response(queue_full):
+    """ 503 with Retry-After, returned when the render queue is full. """
+    logging.warning("Render queue full; rejecting request.")
+    response = jsonify({'error': str(queue_full)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(queue_full.retry_after)
+    return response
+
+
+def get_rendered_timeline(plan, fmt='png', dpi=200, key=None, timings=None):
+    """
+    Returns ``(summary, image_bytes)`` for a plan, rendering only on a cache miss.
+    ``timings`` receives the schedule and render phase times when a render happens.
+    Raises:
+        CircularDependencyError: If the dependencies contain a cycle.
+        RenderQueueFull: If every render worker and queue slot is busy.
+        RenderTimeout: If the render takes longer than the configured timeout.
+    """
+    key = key or plan_fingerprint(plan, fmt=fmt, dpi=dpi)
+    cached = render_cache.get(key)
+    if cached is not None:
+        return cached
+
+    schedule = compute_schedule(plan, timings=timings)
+    image_bytes = render_service.render(plan, schedule, fmt=fmt, dpi=dpi, timings=timings)
+    summary = schedule_summary(plan, schedule)
+    render_cache.put(key, summary, image_bytes)
+    return summary, image_bytes
+
+
+# --- Output Options ---
+IMAGE_MIMETYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+}
+
+
+def parse_output_options(data):
+    """
+    Reads the image format and response mode from a request payload.
+    ``output`` is 'base64' (image inside the JSON body, the default for existing clients)
+    or 'binary' (raw image body with the schedule summary in headers).
+    Raises:
+        ValueError: If the format or output mode is not supported.
+    """
+    data = data or {}
+    fmt = str(data.get('format', 'png')).lower()
+    output = str(data.get('output', 'base64')).lower()
+    if fmt not in IMAGE_MIMETYPES:
+        raise ValueError(f"Unsupported image format '{fmt}'. Use one of: {', '.join(IMAGE_MIMETYPES)}")
+    if output not in ('base64', 'binary'):
+        raise ValueError(f"Unsupported output mode '{output}'. Use 'base64' or 'binary'.")
+    return fmt, output
+
+
+def image_response(summary, image_bytes, fmt, download_name=None):
+    """
+    Streams image bytes as a direct response, with the schedule summary in headers.
+    ``X-Timeline-Summary`` carries the same fields as the JSON response (minus the image).
+    """
+    response = send_file(
+        io.BytesIO(image_bytes),
+        mimetype=IMAGE_MIMETYPES[fmt],
+        as_attachment=download_name is not None,
+        download_name=download_name,
+        etag=False
+    )
+    response.headers['X-Timeline-Summary'] = json.dumps(summary, separators=(',', ':'))
+    response.headers['X-Project-Start'] = summary['start_date']
+    response.headers['X-Project-End'] = summary['end_date']
+    response.headers['X-Total-Days'] = str(summary['total_days'])
+    response.headers['X-Working-Days'] = str(summary['working_days'])
+    return response
+
+
 @app.route('/generate-timeline', methods=['POST'])
 def generate_timeline():
     try:
         data = request.json
-        logging.info(f"Received data: {data}")
+        logging.debug("Received data: %s", data) # Formatted only when DEBUG is on
+
+        # --- Parse and check the client's copy ---
+        plan = parse_request_plan(data)
+        fmt, output = parse_output_options(data)
+        key = plan_fingerprint(plan, fmt=fmt, dpi=200)
+        # Binary and base64 bodies are different representations of the same render
+        etag = key if output == 'base64' else f"{key}-{output}"
+        if _not_modified(etag):
+            return _not_modified_response(etag)
+
+        # --- Schedule and Render (cached) ---
+        try:
+            summary, image_bytes = get_rendered_timeline(plan, fmt=fmt, key=key, timings=g.timings)
+        except CircularDependencyError as ce:
+            logging.error(str(ce))
+            return jsonify({'error': str(ce), 'cycle': ce.cycle}), 400
+
+        with timed(g.timings, 'encode'):
+            if output == 'binary':
+                response = image_response(summary, image_bytes, fmt)
+            else:
+                response_data = dict(summary)
+                response_data['image'] = base64.b64encode(image_bytes).decode('utf-8')
+                response_data['image_format'] = fmt
+                response = jsonify(response_data)
+        response.set_etag(etag)
+        return response
+
+    except RenderQueueFull as qf:
+        return render_busy_response(qf)
+    except RenderTimeout as rt:
+        return jsonify({'error': str(rt)}), 504
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+    except Exception as e:
+        logging.exception("An error occurred during timeline generation:") # Log full traceback
+        return jsonify({'error': f'An internal error occurred: {e}'}), 500
 
-        # --- Extract Parameters ---
-        project_name = data.get('project_name', 'Project Timeline')
-        start_date_str = data.get('start_date', datetime.now().strftime('%Y-%m-%d'))
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-        # Default weekly holiday is Friday (4) if not provided by frontend
-        weekly_holiday = int(data.get('weekly_holiday', 4)) # 0=Mon, 1=Tue, ..., 6=Sun
 
-        # --- Correctly determine the weekly holiday name ---
-        day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# --- Schedule-only Route (no rendering) ---
+@app.route('/schedule', methods=['POST'])
+def schedule_timeline():
+    """ Returns the computed dates for every task without drawing the chart. """
+    try:
+        plan = parse_request_plan(request.json)
         try:
-            correct_weekly_holiday_name = day_names[weekly_holiday]
-        except IndexError:
-            correct_weekly_holiday_name = "Invalid Day" # Fallback
-        # --- End correct name determination ---
-
-        # --- Parse Holidays ---
-        holidays = []
-        for holiday in data.get('holidays', []):
+            schedule = compute_schedule(plan, timings=g.timings)
+        except CircularDependencyError as ce:
+            logging.error(str(ce))
+            return jsonify({'error': str(ce), 'cycle': ce.cycle}), 400
+
+        with timed(g.timings, 'encode'):
+            response = schedule_summary(plan, schedule)
+            response['tasks'] = [task_to_json(t) for t in schedule['tasks']]
+            return jsonify(response)
+
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+    except Exception as e:
+        logging.exception("An error occurred during scheduling:")
+        return jsonify({'error': f'An internal error occurred: {e}'}), 500
+
+
+# --- Incremental Rescheduling (single edits) ---
+@app.route('/schedule/incremental', methods=['POST'])
+def schedule_incremental():
+    """
+    Applies a list of edits to a previously scheduled plan and returns only the tasks that moved.
+    Body: the plan as sent to /schedule, plus 'schedule' (the prior /schedule response or its
+    'tasks' list) and 'changes' (see ``scheduler.apply_changes``).
+    """
+    try:
+        data = request.json or {}
+        plan = parse_request_plan(data)
+        prior = data.get('schedule') or {}
+        prior_tasks = prior.get('tasks') if isinstance(prior, dict) else prior
+        prior_dates = parse_prior_dates(prior_tasks, len(plan['tasks']))
+        edited, added_holidays = apply_changes(plan, data.get('changes', []))
+        try:
+            with timed(g.timings, 'schedule'):
+                schedule, changed_ids = reschedule_incremental(plan, prior_dates, edited, added_holidays)
+        except CircularDependencyError as ce:
+            logging.error(str(ce))
+            return jsonify({'error': str(ce), 'cycle': ce.cycle}), 400
+
+        with timed(g.timings, 'encode'):
+            response = schedule_summary(plan, schedule)
+            response['changed_tasks'] = [task_to_json(schedule['tasks'][i]) for i in changed_ids]
+            return jsonify(response)
+
+    except (ValueError, TypeError, KeyError) as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+    except Exception as e:
+        logging.exception("An error occurred during incremental scheduling:")
+        return jsonify({'error': f'An internal error occurred: {e}'}), 500
+
+
+# --- Portfolio (Batch) Scheduling ---
+def _ndjson(obj):
+    return json.dumps(obj, separators=(',', ':')) + '\n'
+
+
+def _portfolio_summary(name, holidays, weekly_holiday_name, results, calendar):
+    """ Builds a plan/schedule pair with one bar per project, for the summary Gantt. """
+    rows = []
+    for index in sorted(results):
+        plan, schedule = results[index]
+        rows.append({
+            'id': len(rows),
+            'name': plan['project_name'],
+            'duration': schedule['working_days'],
+            'start_date': schedule['project_start'],
+            'end_date': schedule['project_end'],
+        })
+    start = min(r['start_date'] for r in rows)
+    end = max(r['end_date'] for r in rows)
+    plan = {'project_name': name, 'holidays': holidays, 'weekly_holiday_name': weekly_holiday_name}
+    schedule = {
+        'tasks': rows,
+        'project_start': start,
+        'project_end': end,
+        'total_days': (end - start).days + 1,
+        'working_days': calendar.working_days_between(start, end),
+    }
+    return plan, schedule
+
+
+@app.route('/batch-schedule', methods=['POST'])
+def batch_schedule():
+    """
+    Schedules many projects that share one holiday calendar and weekly holiday.
+    The calendar is built once; projects are scheduled in parallel on the worker pool and
+    streamed back as NDJSON lines in completion order, each tagged with its 'index'.
+    'render' may be 'none' (default), 'per_project' (an 'image' line per project) or
+    'summary' (one Gantt with a bar per project, sent last).
+    """
+    try:
+        data = request.json or {}
+        projects = data.get('projects')
+        if not isinstance(projects, list) or not projects:
+            raise ValueError("'projects' must be a non-empty list")
+        render_mode = str(data.get('render', 'none')).lower()
+        if render_mode not in ('none', 'per_project', 'summary'):
+            raise ValueError(f"Unsupported render mode '{render_mode}'. Use 'none', 'per_project' or 'summary'.")
+        fmt, _ = parse_output_options(data)
+
+        # --- Shared calendar, parsed once for the whole portfolio ---
+        weekly_holiday, weekly_holiday_name = parse_weekly_holiday(data.get('weekly_holiday', 4))
+        holidays = parse_holidays(data.get('holidays', []))
+        calendar = get_work_calendar(holidays, weekly_holiday)
+        portfolio_name = data.get('portfolio_name', 'Portfolio')
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+
+    logging.info(f"Batch of {len(projects)} projects, render={render_mode}")
+
+    def generate():
+        items, errors = [], 0
+        for index, project in enumerate(projects):
             try:
-                holiday_start = datetime.strptime(holiday.get('start_date'), '%Y-%m-%d')
-                holiday_end = datetime.strptime(holiday.get('end_date'), '%Y-%m-%d')
-                # Ensure end date is not before start date
-                if holiday_end < holiday_start:
-                     holiday_end = holiday_start # Treat as single day if invalid range
-                holiday_name = holiday.get('name', 'Holiday')
-                holiday_color = holiday.get('color', '#ff9999')
-                holidays.append({
-                    'start': holiday_start,
-                    'end': holiday_end,
-                    'name': holiday_name,
-                    'color': holiday_color
-                })
-            except (ValueError, TypeError) as e:
-                logging.warning(f"Skipping invalid holiday data: {holiday}. Error: {e}")
-                continue # Skip invalid holiday entries
-
-        # --- Parse Tasks and Dependencies ---
-        tasks_input = data.get('tasks', [])
-        if not tasks_input:
-             # Add default tasks if none provided (for easier testing)
-            tasks_input = [
-                {"name": "Riser Works", "duration": 8, "depends_on_index": None},
-                {"name": "Riser Pressure Test", "duration": 2, "depends_on_index": 0},
-                {"name": "Sprinkler Works", "duration": 10, "depends_on_index": 1},
-                {"name": "Sprinkler Pressure Test", "duration": 2, "depends_on_index": 2},
-                {"name": "Product Ex Work", "duration": 49, "depends_on_index": None},
-                {"name": "Shipped on Board", "duration": 18, "depends_on_index": 4},
-                {"name": "Vessel at Chittagong", "duration": 21, "depends_on_index": 5},
-                {"name": "Materials from port to site", "duration": 10, "depends_on_index": 6},
-                {"name": "Pump Room", "duration": 10, "depends_on_index": 7},
-                {"name": "Testing Commissioning & Balancing", "duration": 5, "depends_on_index": 8},
-            ]
-
-        tasks = []
-        for i, task_data in enumerate(tasks_input):
-            name = task_data.get('name', f'Task {i+1}')
-            duration = int(task_data.get('duration', 1))
-            depends_on_index = task_data.get('depends_on_index')
-            # Validate depends_on_index
-            if depends_on_index is not None:
-                 try:
-                     depends_on_index = int(depends_on_index)
-                     if not (0 <= depends_on_index < len(tasks_input)):
-                         logging.warning(f"Task '{name}' has invalid dependency index {depends_on_index}. Setting to None.")
-                         depends_on_index = None
-                 except (ValueError, TypeError):
-                      logging.warning(f"Task '{name}' has non-integer dependency index {depends_on_index}. Setting to None.")
-                      depends_on_index = None
-
-            tasks.append({
-                'id': i, # Use index as ID for simplicity
-                'name': name,
-                'duration': duration,
-                'depends_on_index': depends_on_index,
-                'start_date': None, # To be calculated
-                'end_date': None    # To be calculated
-            })
-
-        # --- Calculate Task Dates based on Dependencies ---
-        tasks_processed = 0
-        max_iterations = len(tasks) * 2 # Safety break for circular dependencies
-        iterations = 0
-
-        # Find the actual project start date (first working day on or after requested start)
-        actual_project_start_date = find_next_working_day(start_date, holidays, weekly_holiday)
-
-        while tasks_processed < len(tasks) and iterations < max_iterations:
-            iterations += 1
-            made_progress = False
-            for i in range(len(tasks)):
-                task = tasks[i]
-                if task['start_date'] is not None: # Already processed
+                project = dict(project, weekly_holiday=weekly_holiday)
+                items.append((index, parse_plan(project, holidays=holidays)))
+            except (ValueError, TypeError, AttributeError) as e:
+                errors += 1
+                yield _ndjson({'type': 'error', 'index': index, 'error': f'Invalid input data: {e}'})
+
+        # A few chunks per worker keeps every core busy without flooding the queue
+        chunk_count = max(1, render_service.workers) * 4
+        chunk_size = max(1, -(-len(items) // chunk_count))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+        pending, render_futures, scheduled = set(), {}, {}
+
+        def drain(futures, wait):
+            """ Yields lines for finished schedule futures (all of them if ``wait``). """
+            nonlocal errors
+            done = [f for f in futures if f.done()] if not wait else list(as_completed(futures))
+            for future in done:
+                futures.discard(future)
+                for index, plan, schedule, error in future.result():
+                    if error is not None:
+                        errors += 1
+                        yield _ndjson(dict(error, type='error', index=index))
+                        continue
+                    scheduled[index] = (plan, schedule)
+                    line = schedule_summary(plan, schedule)
+                    line.update({'type': 'schedule', 'index': index,
+                                 'tasks': [task_to_json(t) for t in schedule['tasks']]})
+                    yield _ndjson(line)
+                    if render_mode == 'per_project':
+                        key = plan_fingerprint(plan, fmt=fmt, dpi=200)
+                        cached = render_cache.get(key)
+                        if cached is not None:
+                            yield _image_line(index, cached[1])
+                        else:
+                            try:
+                                f = render_service.submit(plan, schedule, fmt, 200, block=True)
+                                render_futures[f] = (index, key, line)
+                            except RenderQueueFull as qf:
+                                errors += 1
+                                yield _ndjson({'type': 'error', 'index': index, 'error': str(qf)})
+
+        def _image_line(index, image_bytes):
+            return _ndjson({'type': 'image', 'index': index, 'format': fmt,
+                            'image': base64.b64encode(image_bytes).decode('utf-8')})
+
+        def drain_renders(wait):
+            nonlocal errors
+            done = [f for f in render_futures if f.done()] if not wait else list(as_completed(render_futures))
+            for future in done:
+                index, key, summary = render_futures.pop(future)
+                try:
+                    image_bytes = future.result()
+                except Exception as e:
+                    errors += 1
+                    yield _ndjson({'type': 'error', 'index': index, 'error': f'Rendering failed: {e}'})
                     continue
+                render_cache.put(key, {k: v for k, v in summary.items() if k not in ('type', 'index', 'tasks')}, image_bytes)
+                yield _image_line(index, image_bytes)
+
+        try:
+            for chunk in chunks:
+                pending.add(render_service.submit_call(schedule_batch_chunk, chunk, calendar, block=True))
+                yield from drain(pending, wait=False)
+                yield from drain_renders(wait=False)
+            yield from drain(pending, wait=True)
+            yield from drain_renders(wait=True)
+
+            if render_mode == 'summary' and scheduled:
+                summary_plan, summary_schedule = _portfolio_summary(
+                    portfolio_name, holidays, weekly_holiday_name, scheduled, calendar)
+                future = render_service.submit(summary_plan, summary_schedule, fmt, 200, block=True)
+                image_bytes = future.result(timeout=render_service.timeout)
+                yield _ndjson({'type': 'summary_image', 'format': fmt,
+                               'image': base64.b64encode(image_bytes).decode('utf-8')})
+        except Exception as e:
+            logging.exception("An error occurred during batch scheduling:")
+            errors += 1
+            yield _ndjson({'type': 'error', 'error': f'An internal error occurred: {e}'})
+
+        yield _ndjson({'type': 'done', 'projects': len(projects), 'scheduled': len(scheduled), 'errors': errors})
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+# --- Asynchronous Render Jobs ---
+def job_to_json(job):
+    """ Public view of a job record. """
+    response = dict(job['summary'])
+    response.update({
+        'job_id': job['id'],
+        'status': job['status'],
+        'format': job['format'],
+        'status_url': url_for('job_status', job_id=job['id']),
+    })
+    if job['status'] == 'done':
+        response['image_url'] = url_for('job_image', job_id=job['id'])
+    if job['error']:
+        response['error'] = job['error']
+    return response
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """ Schedules the plan now and renders its image in the background. """
+    try:
+        data = request.json
+        plan = parse_request_plan(data)
+        fmt, _ = parse_output_options(data)
+        try:
+            schedule = compute_schedule(plan, timings=g.timings)
+        except CircularDependencyError as ce:
+            logging.error(str(ce))
+            return jsonify({'error': str(ce), 'cycle': ce.cycle}), 400
+
+        summary = schedule_summary(plan, schedule)
+        job = job_manager.create(plan, schedule, summary, fmt, 200,
+                                 cache_key=plan_fingerprint(plan, fmt=fmt, dpi=200))
+
+        response_data = job_to_json(job)
+        response_data['tasks'] = [task_to_json(t) for t in schedule['tasks']]
+        response = jsonify(response_data)
+        response.status_code = 202
+        response.headers['Location'] = response_data['status_url']
+        return response
+
+    except RenderQueueFull as qf:
+        return render_busy_response(qf)
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+    except Exception as e:
+        logging.exception("An error occurred while creating a render job:")
+        return jsonify({'error': f'An internal error occurred: {e}'}), 500
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job.'}), 404
+    return jsonify(job_to_json(job))
+
+
+@app.route('/jobs/<job_id>/image', methods=['GET'])
+def job_image(job_id):
+    job, image_bytes = job_manager.get_image(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job.'}), 404
+    if job['status'] == 'pending':
+        response = jsonify(job_to_json(job))
+        response.status_code = 202
+        response.headers['Retry-After'] = '1'
+        return response
+    if job['status'] == 'failed' or image_bytes is None:
+        return jsonify({'error': job['error'] or 'Rendered image is no longer available.'}), 500
+    return image_response(job['summary'], image_bytes, job['format'])
+
+
+# --- Saved Projects (versioned, served without recomputation) ---
+def project_etag(record):
+    """ Validator of a stored project version; the fingerprint covers the plan and its calendar. """
+    return f"{record['fingerprint']}-v{record['version']}"
+
+
+def project_body_response(record, status=200):
+    """ Serves the stored schedule JSON as-is, without parsing or re-encoding it. """
+    response = Response(record['body'], status=status, mimetype='application/json')
+    response.set_etag(project_etag(record))
+    response.headers['X-Project-Version'] = str(record['version'])
+    return response
 
-                dependency_met = False
-                calculated_start = actual_project_start_date # Default start if no dependency
-
-                if task['depends_on_index'] is None:
-                    dependency_met = True
-                else:
-                    dep_index = task['depends_on_index']
-                    if 0 <= dep_index < len(tasks) and tasks[dep_index]['end_date'] is not None:
-                        # Dependency finished, start the day after
-                        potential_start = tasks[dep_index]['end_date'] + timedelta(days=1)
-                        # Find the next *working* day
-                        calculated_start = find_next_working_day(potential_start, holidays, weekly_holiday)
-                        dependency_met = True
-                    # else: dependency not yet processed, wait
-
-                if dependency_met:
-                    task['start_date'] = calculated_start
-                    # Duration includes the start day itself
-                    task['end_date'] = calculate_end_date(task['start_date'], task['duration'], holidays, weekly_holiday)
-                    tasks_processed += 1
-                    made_progress = True
-                    logging.info(f"Processed task '{task['name']}': {task['start_date'].strftime('%Y-%m-%d')} -> {task['end_date'].strftime('%Y-%m-%d')}")
-
-
-            if not made_progress and tasks_processed < len(tasks):
-                 # Check for unprocessed tasks without met dependencies (potential issue or cycle)
-                 unprocessed = [t['name'] for t in tasks if t['start_date'] is None]
-                 logging.warning(f"No progress made in iteration {iterations}. Possible circular dependency or issue. Unprocessed: {unprocessed}")
-                 # Optionally, break or try to resolve. For now, we break with the max_iterations check.
-
-
-        if tasks_processed < len(tasks):
-             # Not all tasks could be processed - likely a circular dependency
-             unprocessed_tasks = [t['name'] for t in tasks if t['start_date'] is None]
-             error_msg = f"Could not process all tasks, possible circular dependency. Unprocessed: {', '.join(unprocessed_tasks)}"
-             logging.error(error_msg)
-             # Return an error or proceed with processed tasks? Let's return error for clarity.
-             return jsonify({'error': error_msg}), 400
-
-
-        # --- Calculate Project End Date and Durations ---
-        if not tasks or not any(t['end_date'] for t in tasks):
-             project_end = actual_project_start_date # Handle case with no tasks
-        else:
-            project_end = max(t['end_date'] for t in tasks if t['end_date'] is not None)
-
-        total_days = (project_end - actual_project_start_date).days + 1 # Calendar days
-
-        # Calculate actual working days (excluding holidays AND weekly holiday)
-        working_days = 0
-        if total_days > 0: # Avoid unnecessary loops if duration is 0 or less
-            current = actual_project_start_date
-            while current <= project_end:
-                is_holiday = any(h['start'] <= current <= h['end'] for h in holidays)
-                is_weekly_off = current.weekday() == weekly_holiday
-                if not is_holiday and not is_weekly_off:
-                    working_days += 1
-                current += timedelta(days=1)
-
-        # --- Plotting ---
-        fig, ax = plt.subplots(figsize=(15, max(8, len(tasks) * 0.6))) # Adjust height based on tasks
-
-        # Task categories and colors (Simplified - apply color cyclically or based on some logic if needed)
-        # Example: cycle through a predefined list of colors
-        plot_colors = ['#3498db', '#e74c3c', '#1abc9c', '#9b59b6', '#f1c40f',
-                       '#2ecc71', '#e67e22', '#34495e', '#16a085', '#d35400']
-        num_colors = len(plot_colors)
-
-        task_names = [t['name'] for t in tasks]
-
-        # Plotting each task as a bar
-        plotted_indices = [] # Keep track of y-positions used
-        for i, task in enumerate(tasks):
-            if task['start_date'] is None or task['end_date'] is None:
-                logging.warning(f"Skipping plotting task '{task['name']}' as dates were not calculated.")
-                continue
-
-            start_num = mdates.date2num(task['start_date'])
-            end_num = mdates.date2num(task['end_date'])
-            # duration_days = (task['end_date'] - task['start_date']).days + 1 # Recalculate for plotting width - Not needed for barh
-
-            # Use barh with numeric dates; width is end_num - start_num + 1 (to include the end day)
-            ax.barh(i, end_num - start_num + 1, left=start_num, height=0.6, align='center',
-                    color=plot_colors[i % num_colors], alpha=0.85, edgecolor='black', label=task['name'] if i < 5 else "") # Label only first few to avoid clutter
-
-            # Add duration text inside the bar
-            text_x_num = start_num + (end_num - start_num + 1) / 2
-            ax.text(mdates.num2date(text_x_num), i, f"{task['duration']}d", # Use original task duration
-                    ha='center', va='center', color='white', fontweight='bold',
-                    fontsize=9, bbox=dict(facecolor=plot_colors[i % num_colors], alpha=0.9, boxstyle="round,pad=0.2",edgecolor='none'))
-            plotted_indices.append(i)
-
-
-        # --- Add Holiday Period Indications ---
-        if holidays and plotted_indices:
-            min_y_axis, max_y_axis = ax.get_ylim() # Get current y-limits
-            min_plotted_y, max_plotted_y = min(plotted_indices), max(plotted_indices)
-            # Calculate relative positions for axvspan
-            y_min_rel = (min_plotted_y - 0.5 - min_y_axis) / (max_y_axis - min_y_axis)
-            y_max_rel = (max_plotted_y + 0.5 - min_y_axis) / (max_y_axis - min_y_axis)
-
-            legend_added = set() # Avoid duplicate holiday legends
-            for holiday in holidays:
-                h_start_num = mdates.date2num(holiday['start'])
-                h_end_num = mdates.date2num(holiday['end'])
-                # Draw vertical span covering the plotted task area
-                # Add 1 to end_num because axvspan excludes the endpoint date visually
-                ax.axvspan(h_start_num, h_end_num + 1, ymin=y_min_rel, ymax=y_max_rel,
-                           color=holiday['color'], alpha=0.2, zorder=-1) # Behind tasks
-
-                # Optionally add vertical lines at start/end
-                ax.axvline(x=h_start_num, color=holiday['color'], linestyle=':', alpha=0.6, linewidth=1)
-                ax.axvline(x=h_end_num+1, color=holiday['color'], linestyle=':', alpha=0.6, linewidth=1)
-
-                # Add to legend only once per name
-                if holiday['name'] not in legend_added:
-                     # Create dummy patch for legend (can be used if needed)
-                     # patch = plt.Rectangle((0, 0), 1, 1, fc=holiday['color'], alpha=0.3)
-                     legend_added.add(holiday['name'])
-
-        # --- Formatting ---
-        ax.set_yticks(range(len(tasks)))
-        ax.set_yticklabels(task_names, fontsize=10)
-        ax.invert_yaxis() # Tasks top-to-bottom
-
-        ax.set_xlabel('Date', fontsize=12, fontweight='bold')
-        ax.set_ylabel('Tasks', fontsize=12, fontweight='bold')
-        ax.set_title(f'{project_name} - Timeline', fontsize=16, fontweight='bold')
-
-        # Format dates on x-axis
-        date_format = mdates.DateFormatter('%b %d, %Y')
-        ax.xaxis.set_major_formatter(date_format)
-        ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=1)) # Major ticks weekly
-        ax.xaxis.set_minor_locator(mdates.DayLocator()) # Minor ticks daily
-
-        ax.grid(True, axis='x', linestyle='--', alpha=0.6, which='major') # Grid lines for weeks
-        ax.grid(True, axis='x', linestyle=':', alpha=0.3, which='minor') # Fainter grid lines for days
-
-        # Set x-axis limits with padding
-        if tasks and any(t['start_date'] for t in tasks):
-            plot_start_date = min(t['start_date'] for t in tasks if t['start_date'] is not None)
-            plot_end_date = project_end
-            ax.set_xlim(plot_start_date - timedelta(days=2), plot_end_date + timedelta(days=2))
-        else: # Handle empty timeline case
-            ax.set_xlim(actual_project_start_date - timedelta(days=2), actual_project_start_date + timedelta(days=10))
-
-
-        # Set y-axis limits (if tasks exist)
-        if plotted_indices:
-            ax.set_ylim(max(plotted_indices) + 0.5, min(plotted_indices) - 0.5) # Inverted axis
-        else:
-             ax.set_ylim(0.5, -0.5) # Handle empty case
-
-        # Set background color
-        ax.set_facecolor('#f8f9fa')
-        fig.patch.set_facecolor('#ffffff')
-
-        # Add Legend (Consider placing it outside plot area if too cluttered)
-        # handles, labels = ax.get_legend_handles_labels() # Get labels from barh plots if used
-        # if handles:
-        #    ax.legend(handles, labels, loc='upper center', bbox_to_anchor=(0.5, -0.15), ncol=min(5, len(handles)))
-
-        # --- Add text annotations for key info ---
-        plt.figtext(0.02, 0.03, f"Start: {actual_project_start_date.strftime('%b %d, %Y')}", fontsize=9, fontweight='bold')
-        plt.figtext(0.30, 0.03, f"End: {project_end.strftime('%b %d, %Y')}", fontsize=9, fontweight='bold')
-        plt.figtext(0.60, 0.03, f"Duration: {total_days} Cal. Days", fontsize=9, fontweight='bold', color='#2c3e50')
-        # CORRECTED: Use the correct holiday name in the plot annotation
-        plt.figtext(0.80, 0.03, f"Work Days: {working_days} ({correct_weekly_holiday_name} Off)", fontsize=9, fontweight='bold', color='#2c3e50')
-
-
-        # Rotate date labels for better readability
-        plt.xticks(rotation=30, ha='right')
-
-        # Adjust layout
-        plt.tight_layout(rect=[0, 0.06, 1, 0.96]) # Adjust bottom margin for figtext
-
-        # --- Save and Return ---
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=200) # Lower DPI slightly if performance is an issue
-        buf.seek(0)
-        image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-        plt.close(fig) # Close the figure to free memory
-
-        # CORRECTED: Return the correct holiday name in the JSON response
-        return jsonify({
-            'project_name': project_name,
-            'start_date': actual_project_start_date.strftime('%Y-%m-%d'), # Return actual start
-            'end_date': project_end.strftime('%Y-%m-%d'),
-            'total_days': total_days,
-            'working_days': working_days,
-            'image': image_base64,
-            'weekly_holiday': weekly_holiday, # Keep the integer value
-            'weekly_holiday_name': correct_weekly_holiday_name # Use the correct name
-        })
 
+@app.route('/projects', methods=['GET'])
+def list_projects():
+    """ Current version and summary of every saved project, or of ``?ids=a,b,c``. """
+    try:
+        ids = request.args.get('ids')
+        projects = project_store.list(ids.split(',') if ids else None)
+        for project in projects:
+            project['url'] = url_for('get_project', project_id=project['id'])
+        return jsonify({'projects': projects})
     except ValueError as ve:
          logging.error(f"Value error: {ve}")
          return jsonify({'error': f'Invalid input data: {ve}'}), 400
     except Exception as e:
-        logging.exception("An error occurred during timeline generation:") # Log full traceback
+        logging.exception("An error occurred while listing projects:")
         return jsonify({'error': f'An internal error occurred: {e}'}), 500
 
 
-# --- Download Route (Refactored to reuse generation logic) ---
-@app.route('/download-timeline', methods=['POST'])
-def download_timeline():
+@app.route('/projects/<project_id>', methods=['PUT'])
+def save_project(project_id):
+    """
+    Saves a plan under ``project_id`` and stores its schedule as a new version.
+    Re-saving a plan with the same fingerprint keeps the current version (200);
+    a changed plan or calendar creates the next version (201) and drops stored images.
+    The plan is stored with its defaults resolved; a re-save without 'start_date' keeps
+    the stored start date rather than moving the project to today.
+    """
+    try:
+        check_project_id(project_id)
+        data = request.json
+        current = project_store.head(project_id)
+        if current is not None and isinstance(data, dict) and 'start_date' not in data:
+            stored = project_store.get(project_id)
+            if stored is not None:
+                data = dict(data, start_date=json.loads(stored['plan'])['start_date'])
+        plan = parse_request_plan(data)
+        fingerprint = plan_fingerprint(plan)
+        if current is not None and current['fingerprint'] == fingerprint:
+            return project_body_response(project_store.get(project_id))
+
+        try:
+            schedule = compute_schedule(plan, timings=g.timings)
+        except CircularDependencyError as ce:
+            logging.error(str(ce))
+            return jsonify({'error': str(ce), 'cycle': ce.cycle}), 400
+
+        with timed(g.timings, 'encode'):
+            summary = schedule_summary(plan, schedule)
+            tasks = [task_to_json(t) for t in schedule['tasks']]
+
+            def build_body(version):
+                body = dict(summary, project_id=project_id, version=version, tasks=tasks)
+                return json.dumps(summary, separators=(',', ':')), json.dumps(body, separators=(',', ':'))
+
+            version, created = project_store.save(project_id, fingerprint, json.dumps(plan_to_payload(plan)), build_body)
+        logging.info(f"Project {project_id}: {'saved version' if created else 'unchanged at version'} {version}")
+
+        response = project_body_response(project_store.get(project_id, version), status=201 if created else 200)
+        response.headers['Location'] = url_for('get_project', project_id=project_id)
+        return response
+
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+    except Exception as e:
+        logging.exception("An error occurred while saving a project:")
+        return jsonify({'error': f'An internal error occurred: {e}'}), 500
+
+
+@app.route('/projects/<project_id>', methods=['GET'])
+def get_project(project_id):
+    """ The stored schedule of the current version (or ``?version=N``), with an ETag. """
     try:
-        # Re-generate the image based on the same POST data to get the buffer.
-        # Note: In a production app, caching the result or having JS send
-        # the generated image data might be more efficient.
+        version = request.args.get('version', type=int)
+        record = project_store.get(project_id, version)
+        if record is None:
+            return jsonify({'error': 'Unknown project or version.'}), 404
+        if _not_modified(project_etag(record)):
+            return _not_modified_response(project_etag(record))
+        return project_body_response(record)
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+    except Exception as e:
+        logging.exception("An error occurred while reading a project:")
+        return jsonify({'error': f'An internal error occurred: {e}'}), 500
 
-        # Calling generate_timeline() returns a Flask Response object.
-        # We need to get the JSON data from it if it's successful.
-        response = generate_timeline() # This executes the endpoint logic again
 
-        if response.status_code != 200:
-            # If generation failed, return the error response directly
-            return response
+@app.route('/projects/<project_id>', methods=['DELETE'])
+def delete_project(project_id):
+    try:
+        if not project_store.delete(project_id):
+            return jsonify({'error': 'Unknown project.'}), 404
+        return Response(status=204)
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+    except Exception as e:
+        logging.exception("An error occurred while deleting a project:")
+        return jsonify({'error': f'An internal error occurred: {e}'}), 500
 
-        # If generation succeeded, get the JSON data from the response
-        response_data = response.get_json()
-        image_base64 = response_data.get('image')
 
-        if not image_base64:
-            logging.error("Image data not found in regeneration response for download.")
-            return jsonify({'error': 'Failed to retrieve generated image for download.'}), 500
+@app.route('/projects/<project_id>/plan', methods=['GET'])
+def get_project_plan(project_id):
+    """ The plan payload as it was saved, e.g. to load it back into the form. """
+    try:
+        record = project_store.get(project_id, request.args.get('version', type=int))
+        if record is None:
+            return jsonify({'error': 'Unknown project or version.'}), 404
+        response = Response(record['plan'], mimetype='application/json')
+        response.headers['X-Project-Version'] = str(record['version'])
+        return response
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+    except Exception as e:
+        logging.exception("An error occurred while reading a project plan:")
+        return jsonify({'error': f'An internal error occurred: {e}'}), 500
 
-        # Decode the base64 image
-        image_bytes = base64.b64decode(image_base64)
-        buf = io.BytesIO(image_bytes)
-        buf.seek(0)
+
+@app.route('/projects/<project_id>/versions', methods=['GET'])
+def get_project_versions(project_id):
+    try:
+        versions = project_store.versions(project_id)
+        if not versions:
+            return jsonify({'error': 'Unknown project.'}), 404
+        return jsonify({'project_id': project_id, 'versions': versions})
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+    except Exception as e:
+        logging.exception("An error occurred while listing project versions:")
+        return jsonify({'error': f'An internal error occurred: {e}'}), 500
+
+
+@app.route('/projects/<project_id>/image', methods=['GET'])
+def get_project_image(project_id):
+    """
+    The chart of the current version in ``?format=`` (png by default). The first request
+    per version and format renders and stores it; later ones read the stored bytes.
+    ``?download=1`` sends it as an attachment.
+    """
+    try:
+        fmt, _ = parse_output_options({'format': request.args.get('format', 'png')})
+        current = project_store.head(project_id)
+        if current is None:
+            return jsonify({'error': 'Unknown project.'}), 404
+        etag = f"{project_etag(current)}-{fmt}"
+        if _not_modified(etag):
+            return _not_modified_response(etag)
+
+        version = current['version']
+        image_bytes = project_store.get_artefact(project_id, version, fmt)
+        if image_bytes is None:
+            record = project_store.get(project_id, version)
+            if record is None: # Superseded and pruned since the head was read
+                return jsonify({'error': 'Project changed while rendering; retry.'}), 409
+            plan = parse_request_plan(json.loads(record['plan']))
+            _, image_bytes = get_rendered_timeline(plan, fmt=fmt, timings=g.timings)
+            project_store.put_artefact(project_id, version, fmt, image_bytes)
+
+        download_name = f"{project_id}.{fmt}" if request.args.get('download') else None
+        response = image_response(current['summary'], image_bytes, fmt, download_name=download_name)
+        response.headers['X-Project-Version'] = str(version)
+        response.set_etag(etag)
+        return response
+
+    except RenderQueueFull as qf:
+        return render_busy_response(qf)
+    except RenderTimeout as rt:
+        return jsonify({'error': str(rt)}), 504
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+    except Exception as e:
+        logging.exception("An error occurred while rendering a project image:")
+        return jsonify({'error': f'An internal error occurred: {e}'}), 500
+
+
+# --- Tiled Rendering (viewports of large plans) ---
+MAX_TILE_ROWS = 200
+MAX_TILE_ZOOM = 20
+# (plan, schedule) by plan fingerprint, shared by every tile of a plan
+schedule_cache = LRUCache(int(os.environ.get('SCHEDULE_CACHE_ENTRIES', 8)))
+
+
+def get_cached_schedule(plan, plan_key):
+    """ Computes a plan's schedule once and reuses it for every tile of that plan. """
+    cached = schedule_cache.get(plan_key)
+    if cached is not None:
+        return cached[1]
+    schedule = compute_schedule(plan, timings=g.timings)
+    schedule_cache.put(plan_key, (plan, schedule))
+    return schedule
+
+
+def parse_tile_options(data):
+    """
+    Reads the viewport of a tile request from ``data['tile']``.
+    Raises:
+        ValueError: If a field is malformed or out of range.
+    """
+    tile = (data or {}).get('tile') or {}
+    options = {
+        'row_start': int(tile.get('row_start', 0)),
+        'row_count': int(tile.get('row_count', 50)),
+        'zoom': int(tile.get('zoom', 0)),
+        'width': int(tile.get('width', 1024)),
+        'labels': bool(tile.get('labels', True)),
+        'date_start': None,
+        'date_end': None,
+    }
+    for field in ('date_start', 'date_end'):
+        if tile.get(field):
+            options[field] = datetime.strptime(tile[field], '%Y-%m-%d')
+    if options['row_start'] < 0:
+        raise ValueError("'row_start' must not be negative")
+    if not 1 <= options['row_count'] <= MAX_TILE_ROWS:
+        raise ValueError(f"'row_count' must be between 1 and {MAX_TILE_ROWS}")
+    if not 0 <= options['zoom'] <= MAX_TILE_ZOOM:
+        raise ValueError(f"'zoom' must be between 0 and {MAX_TILE_ZOOM}")
+    if not 256 <= options['width'] <= 4096:
+        raise ValueError("'width' must be between 256 and 4096 pixels")
+    if options['date_start'] and options['date_end'] and options['date_end'] < options['date_start']:
+        raise ValueError("'date_end' is before 'date_start'")
+    return options
+
+
+def tile_fingerprint(plan_key, fmt, options):
+    """ Cache key of one tile: the plan's fingerprint plus the viewport. """
+    encoded = json.dumps({'plan': plan_key, 'format': fmt, 'tile': options}, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+@app.route('/timeline-tile', methods=['POST'])
+def timeline_tile():
+    """
+    Renders one small viewport of the chart: ``row_count`` rows from ``row_start`` at a
+    zoom level (zoom z groups 2**z tasks per summary row) over a date window. Tiles are
+    cached by plan and viewport, so panning only renders tiles that were never seen.
+    The response's ``X-Plan-Key`` can be sent as 'plan_key' instead of the tasks on later
+    tiles of the same plan, so they skip re-sending, parsing and hashing the whole plan.
+    """
+    try:
+        data = request.json or {}
+        fmt, _ = parse_output_options(data)
+        tile = parse_tile_options(data)
+        plan = None
+        plan_key = data.get('plan_key') if 'tasks' not in data else None
+        if plan_key is None:
+            plan = parse_request_plan(data)
+            plan_key = plan_fingerprint(plan)
+        elif not isinstance(plan_key, str):
+            raise ValueError("'plan_key' must be a string")
+        key = tile_fingerprint(plan_key, fmt, tile)
+        if _not_modified(key):
+            return _not_modified_response(key)
+
+        cached = render_cache.get(key)
+        if cached is not None:
+            meta, image_bytes = cached
+        else:
+            if plan is None:
+                cached_plan = schedule_cache.get(plan_key)
+                if cached_plan is None:
+                    return jsonify({'error': "Unknown or expired 'plan_key'; send the full plan again."}), 404
+                plan, schedule = cached_plan
+            else:
+                try:
+                    schedule = get_cached_schedule(plan, plan_key)
+                except CircularDependencyError as ce:
+                    logging.error(str(ce))
+                    return jsonify({'error': str(ce), 'cycle': ce.cycle}), 400
+
+            # Default window: the whole project, with the same padding as the full chart
+            date_start = tile['date_start'] or schedule['project_start'] - timedelta(days=2)
+            date_end = tile['date_end'] or schedule['project_end'] + timedelta(days=2)
+            if date_end < date_start:
+                raise ValueError("'date_end' is before 'date_start'")
+            rows = tile_rows(schedule, tile['row_start'], tile['row_count'], tile['zoom'])
+            image_bytes = render_service.call(
+                render_tile, rows, plan['holidays'], tile['row_count'], date_start, date_end,
+                fmt, tile['width'], tile['labels'], tile['row_start'])
+
+            meta = schedule_summary(plan, schedule)
+            meta['tile'] = {
+                'zoom': tile['zoom'],
+                'row_start': tile['row_start'],
+                'row_count': tile['row_count'],
+                'total_rows': tile_row_count(len(schedule['tasks']), tile['zoom']),
+                'date_start': date_start.strftime('%Y-%m-%d'),
+                'date_end': date_end.strftime('%Y-%m-%d'),
+            }
+            render_cache.put(key, meta, image_bytes)
+
+        response = image_response(meta, image_bytes, fmt)
+        response.headers['X-Tile-Total-Rows'] = str(meta['tile']['total_rows'])
+        response.headers['X-Tile-Date-Start'] = meta['tile']['date_start']
+        response.headers['X-Tile-Date-End'] = meta['tile']['date_end']
+        response.headers['X-Plan-Key'] = plan_key
+        response.set_etag(key)
+        return response
+
+    except RenderQueueFull as qf:
+        return render_busy_response(qf)
+    except RenderTimeout as rt:
+        return jsonify({'error': str(rt)}), 504
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
+    except Exception as e:
+        logging.exception("An error occurred during tile rendering:")
+        return jsonify({'error': f'An internal error occurred: {e}'}), 500
+
+
+# --- Download Route (served from the render cache) ---
+@app.route('/download-timeline', methods=['POST'])
+def download_timeline():
+    try:
+        plan = parse_request_plan(request.json)
+        fmt, _ = parse_output_options(request.json)
+        # Same key as /generate-timeline, so a download after a generate never re-renders
+        etag = plan_fingerprint(plan, fmt=fmt, dpi=200)
+        if _not_modified(etag):
+            return _not_modified_response(etag)
+
+        try:
+            summary, image_bytes = get_rendered_timeline(plan, fmt=fmt, key=etag, timings=g.timings)
+        except CircularDependencyError as ce:
+            logging.error(str(ce))
+            return jsonify({'error': str(ce), 'cycle': ce.cycle}), 400
 
         # Use the project name from the original request data for the filename
-        project_name = request.json.get('project_name', 'timeline')
+        project_name = plan['project_name'] or 'timeline'
         # Sanitize filename
         safe_filename = "".join([c for c in project_name if c.isalnum() or c in (' ', '_', '-')]).rstrip()
         safe_filename = safe_filename.replace(' ', '_')
         if not safe_filename: # Handle empty project name case
             safe_filename = 'timeline'
 
-        return send_file(
-            buf,
-            mimetype='image/png',
-            as_attachment=True,
-            download_name=f"{safe_filename}.png"
-        )
+        response = image_response(summary, image_bytes, fmt, download_name=f"{safe_filename}.{fmt}")
+        response.set_etag(etag)
+        return response
 
+    except RenderQueueFull as qf:
+        return render_busy_response(qf)
+    except RenderTimeout as rt:
+        return jsonify({'error': str(rt)}), 504
+    except ValueError as ve:
+         logging.error(f"Value error: {ve}")
+         return jsonify({'error': f'Invalid input data: {ve}'}), 400
     except Exception as e:
         logging.exception("An error occurred during timeline download:")
         # Try to return a JSON error if possible
@@ -0,0 +1,53 @@
+"""
+Render-time benchmark: classic (one artist per task) vs fast (collections) path.
+
+Usage:
+    python benchmarks/bench_render.py [--sizes 50 100 250 500] [--dpi 100] [--repeat 3]
+
+Plans come from plan_generator.py, shared with bench_suite.py.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scheduler import parse_plan, compute_schedule  # noqa: E402
+from renderer import render_timeline  # noqa: E402
+from plan_generator import generate_plan  # noqa: E402
+
+
+def time_render(plan, schedule, fast, dpi, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        render_timeline(plan, schedule, fmt='png', dpi=dpi, fast=fast)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 250, 500])
+    parser.add_argument('--density', type=float, default=0.8, help='Average predecessors per task')
+    parser.add_argument('--depth', type=int, default=20, help='Dependency levels (longest chain)')
+    parser.add_argument('--holidays', type=int, default=40)
+    parser.add_argument('--span', type=int, default=730, help='Date span in calendar days')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{'tasks':>6} {'classic (s)':>12} {'fast (s)':>10} {'speedup':>8}")
+    for size in args.sizes:
+        plan = parse_plan(generate_plan(size, args.density, args.depth, args.holidays, args.span))
+        schedule = compute_schedule(plan)
+        classic = time_render(plan, schedule, False, args.dpi, args.repeat)
+        fast = time_render(plan, schedule, True, args.dpi, args.repeat)
+        print(f"{size:>6} {classic:>12.3f} {fast:>10.3f} {classic / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
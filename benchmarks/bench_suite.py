@@ -0,0 +1,253 @@
+"""
+Benchmark suite: working-day arithmetic, scheduling, rendering and full requests.
+
+Each benchmark runs on synthetic plans (see plan_generator.py) and reports p50/p99
+latency, throughput and peak traced memory. Results can be saved as JSON and compared
+with an earlier run; the exit status is 1 when a regression exceeds its threshold.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 10 100 1000] [--output results.json]
+    python benchmarks/bench_suite.py --compare baseline.json [--thresholds benchmarks/thresholds.json]
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from plan_generator import generate_plan  # noqa: E402
+
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thresholds.json')
+
+
+# --- Measurement ---
+def percentile(samples, pct):
+    """ Nearest-rank percentile of a list of numbers. """
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def measure(fn, repeat, ops_per_call=1):
+    """
+    Times ``fn()`` ``repeat`` times, then once more under tracemalloc for peak memory.
+    Returns:
+        dict: p50/p99/mean latency per operation (ms), throughput (ops/s) and peak memory (KiB).
+    """
+    fn() # Warm-up: imports, caches, first-draw font setup
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) / ops_per_call)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mean = sum(samples) / len(samples)
+    return {
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'mean_ms': mean * 1000,
+        'throughput_per_s': 1 / mean if mean > 0 else None,
+        'peak_memory_kib': peak / 1024,
+        'samples': len(samples),
+    }
+
+
+# --- Benchmarks ---
+def bench_end_date(payload, repeat):
+    """ calculate_end_date (day-by-day reference) vs WorkCalendar.add_working_days, 1000 calls per sample. """
+    from app import calculate_end_date
+    from scheduler import parse_plan
+    from work_calendar import WorkCalendar
+
+    plan = parse_plan(payload)
+    rng = random.Random(0)
+    calls = [(plan['start_date'] + timedelta(days=rng.randint(0, 365)), rng.randint(1, 60)) for _ in range(1000)]
+    holidays, weekly = plan['holidays'], plan['weekly_holiday']
+    calendar = WorkCalendar(holidays, weekly) # Uncached, so its build cost is not hidden
+
+    def reference():
+        for start, duration in calls:
+            calculate_end_date(start, duration, holidays, weekly)
+
+    def indexed():
+        for start, duration in calls:
+            calendar.add_working_days(start, duration)
+
+    return {
+        'calculate_end_date': measure(reference, repeat, ops_per_call=len(calls)),
+        'work_calendar_add_working_days': measure(indexed, repeat, ops_per_call=len(calls)),
+    }
+
+
+def bench_schedule(payload, repeat):
+    """ parse_plan + compute_schedule, with the calendar built per run. """
+    from scheduler import parse_plan, compute_schedule
+    from work_calendar import WorkCalendar
+
+    def run():
+        plan = parse_plan(payload)
+        compute_schedule(plan, WorkCalendar(plan['holidays'], plan['weekly_holiday']))
+
+    return {'schedule': measure(run, repeat)}
+
+
+def bench_render(payload, repeat, dpi):
+    """ render_timeline on a precomputed schedule. """
+    from scheduler import parse_plan, compute_schedule
+    from renderer import render_timeline
+
+    plan = parse_plan(payload)
+    schedule = compute_schedule(plan)
+    return {'render': measure(lambda: render_timeline(plan, schedule, fmt='png', dpi=dpi), repeat)}
+
+
+def bench_request(payload, repeat):
+    """ POST /generate-timeline through the Flask test client, render cache disabled. """
+    import app as timeline_app
+    from render_cache import RenderCache
+
+    timeline_app.render_cache = RenderCache(max_entries=0) # Every request renders
+    client = timeline_app.app.test_client()
+
+    def run():
+        response = client.post('/generate-timeline', json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"/generate-timeline returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    return {'request': measure(run, repeat)}
+
+
+# --- Comparison ---
+def compare(current, baseline, thresholds):
+    """
+    Compares two result files benchmark by benchmark.
+    A result regresses when its p50 latency or peak memory grows by more than the
+    allowed ratio ('latency'/'memory' per benchmark name, else 'default'). Latency
+    changes smaller than 'min_delta_ms' are treated as noise.
+    Returns:
+        list: Human-readable regression messages (empty if none).
+    """
+    def limits(name):
+        entry = thresholds.get(name, {})
+        default = thresholds.get('default', {})
+        return (entry.get('latency', default.get('latency', 0.25)),
+                entry.get('memory', default.get('memory', 0.25)),
+                entry.get('min_delta_ms', default.get('min_delta_ms', 1.0)))
+
+    base = {(r['benchmark'], r['tasks']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = base.get((result['benchmark'], result['tasks']))
+        if old is None:
+            continue
+        latency_limit, memory_limit, min_delta_ms = limits(result['benchmark'])
+        label = f"{result['benchmark']} @ {result['tasks']} tasks"
+        for field, limit in (('p50_ms', latency_limit), ('peak_memory_kib', memory_limit)):
+            if field == 'p50_ms' and result[field] - old[field] < min_delta_ms:
+                continue
+            if old[field] and result[field] > old[field] * (1 + limit):
+                regressions.append(f"{label}: {field} {old[field]:.3f} -> {result[field]:.3f} "
+                                   f"(+{(result[field] / old[field] - 1) * 100:.0f}%, limit +{limit * 100:.0f}%)")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--density', type=float, default=1.5, help='Average predecessors per task')
+    parser.add_argument('--depth', type=int, default=20, help='Dependency levels (longest chain)')
+    parser.add_argument('--holidays', type=int, default=20)
+    parser.add_argument('--span', type=int, default=730, help='Date span in calendar days')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--render-max-tasks', type=int, default=500,
+                        help='Skip render and request benchmarks above this size')
+    parser.add_argument('--only', nargs='+', choices=['end_date', 'schedule', 'render', 'request'])
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file to check for regressions')
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS)
+    args = parser.parse_args()
+
+    # Measure renders in-process so request latency does not include pool start-up
+    os.environ.setdefault('RENDER_WORKERS', '0')
+    logging.disable(logging.WARNING)
+    selected = set(args.only or ['end_date', 'schedule', 'render', 'request'])
+
+    results = []
+    print(f"{'benchmark':<32} {'tasks':>6} {'p50 ms':>10} {'p99 ms':>10} {'ops/s':>10} {'peak KiB':>10}")
+    for size in args.sizes:
+        payload = generate_plan(size, args.density, args.depth, args.holidays, args.span)
+        repeat = max(3, args.repeat if size <= 1000 else args.repeat // 4)
+        measured = {}
+        if 'end_date' in selected:
+            measured.update(bench_end_date(payload, repeat))
+        if 'schedule' in selected:
+            measured.update(bench_schedule(copy.deepcopy(payload), repeat))
+        if size <= args.render_max_tasks:
+            render_repeat = max(3, repeat // 4)
+            if 'render' in selected:
+                measured.update(bench_render(payload, render_repeat, args.dpi))
+            if 'request' in selected:
+                measured.update(bench_request(payload, render_repeat))
+
+        for name, stats in measured.items():
+            results.append(dict(stats, benchmark=name, tasks=size))
+            print(f"{name:<32} {size:>6} {stats['p50_ms']:>10.3f} {stats['p99_ms']:>10.3f} "
+                  f"{stats['throughput_per_s']:>10.1f} {stats['peak_memory_kib']:>10.1f}")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parameters': {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'thresholds')},
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        thresholds = {}
+        if args.thresholds and os.path.exists(args.thresholds):
+            with open(args.thresholds, 'r', encoding='utf-8') as f:
+                thresholds = json.load(f)
+        regressions = compare(report, baseline, thresholds)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare} (commit {baseline['meta'].get('commit')}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Synthetic plan payloads for benchmarks, shaped like /generate-timeline request bodies.
+"""
+import random
+from datetime import datetime, timedelta
+
+
+def generate_plan(num_tasks, dependency_density=0.8, chain_depth=10, num_holidays=20,
+                  span_days=730, weekly_holiday=4, seed=0, start_date='2025-01-01'):
+    """
+    Builds a random but reproducible plan.
+    Tasks are laid out in ``chain_depth`` levels; a task only depends on tasks from
+    earlier levels, so the longest dependency chain has at most ``chain_depth`` tasks.
+    Args:
+        num_tasks (int): Number of tasks.
+        dependency_density (float): Average predecessors per task (tasks in the first level have none).
+        chain_depth (int): Number of dependency levels.
+        num_holidays (int): Holiday ranges (1-5 days) scattered over the date span.
+        span_days (int): Calendar days the task durations and holidays are scaled to.
+        weekly_holiday (int): Weekly day off (0=Monday, 6=Sunday).
+        seed (int): Random seed.
+        start_date (str): Project start, 'YYYY-MM-DD'.
+    Returns:
+        dict: A request payload.
+    """
+    rng = random.Random(seed)
+    chain_depth = max(1, min(chain_depth, num_tasks or 1))
+    # Durations are sized so a full-depth chain roughly fills the span in working days
+    max_duration = max(1, int(span_days * 6 / 7 / chain_depth))
+
+    level_of = [min(chain_depth - 1, i * chain_depth // max(num_tasks, 1)) for i in range(num_tasks)]
+    level_start = {}
+    for i, level in enumerate(level_of):
+        level_start.setdefault(level, i)
+
+    tasks = []
+    for i in range(num_tasks):
+        level = level_of[i]
+        depends_on = []
+        if level > 0:
+            # Averages to ``dependency_density``; the first link goes to the previous level
+            count = int(dependency_density) + (1 if rng.random() < dependency_density % 1 else 0)
+            previous_level = range(level_start[level - 1], level_start[level])
+            candidates = range(0, level_start[level])
+            for k in range(count):
+                pool = previous_level if k == 0 else candidates
+                depends_on.append({'index': rng.choice(pool), 'lag': 0 if rng.random() < 0.8 else rng.randint(1, 3)})
+        tasks.append({'name': f'Task {i + 1}', 'duration': rng.randint(1, max_duration), 'depends_on': depends_on})
+
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    holidays = []
+    for h in range(num_holidays):
+        day = start + timedelta(days=rng.randint(0, max(0, span_days - 1)))
+        holidays.append({'name': f'Holiday {h + 1}', 'start_date': day.strftime('%Y-%m-%d'),
+                         'end_date': (day + timedelta(days=rng.randint(0, 4))).strftime('%Y-%m-%d')})
+
+    return {'project_name': f'Synthetic {num_tasks}', 'start_date': start_date,
+            'weekly_holiday': weekly_holiday, 'tasks': tasks, 'holidays': holidays}
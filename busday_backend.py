@@ -0,0 +1,119 @@
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+# datetime64[D] counts days from 1970-01-01; adding this gives a proleptic ordinal
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+# --- NumPy Business-Day Calendar ---
+@lru_cache(maxsize=64)
+def _cached_busdaycal(weekly_off, holiday_ranges):
+    weekmask = [day not in weekly_off for day in range(7)] # Monday first
+    ranges = [np.arange(start, end + 1) for start, end in holiday_ranges]
+    ordinals = np.concatenate(ranges) if ranges else np.array([], dtype=np.int64)
+    holidays = (ordinals - _EPOCH_ORDINAL).astype('datetime64[D]')
+    return np.busdaycalendar(weekmask=weekmask, holidays=holidays)
+
+
+def busday_calendar(calendar):
+    """
+    Builds the ``np.busdaycalendar`` equivalent of a WorkCalendar: a weekmask from its
+    weekly off days and every day of its (merged) holiday ranges. Cached by those two,
+    like ``get_work_calendar``.
+    Args:
+        calendar (WorkCalendar): The plan's working-day calendar.
+    Returns:
+        np.busdaycalendar
+    """
+    return _cached_busdaycal(calendar.weekly_off, calendar.holiday_ranges())
+
+
+def end_dates(starts, durations, busdaycal):
+    """
+    Vectorised ``calculate_end_date``: the ``duration``-th working day on or after each
+    start. A start on a holiday or weekly off day is rolled forward first (so it does not
+    count as day 1), and a duration <= 0 returns the start unchanged.
+    Args:
+        starts (np.ndarray): datetime64[D] start days.
+        durations (np.ndarray): Working days per task.
+        busdaycal (np.busdaycalendar): From ``busday_calendar``.
+    Returns:
+        np.ndarray: datetime64[D] end days.
+    """
+    offsets = np.maximum(durations, 1) - 1
+    ends = np.busday_offset(starts, offsets, roll='forward', busdaycal=busdaycal)
+    return np.where(durations > 0, ends, starts)
+
+
+# --- Level-by-Level Scheduling ---
+def _edge_ranges(ptr, rows):
+    """ Indexes of every CSR entry belonging to ``rows``, grouped by row; plus the group sizes. """
+    counts = ptr[rows + 1] - ptr[rows]
+    total = int(counts.sum())
+    group_starts = np.repeat(ptr[rows] - (np.cumsum(counts) - counts), counts)
+    return group_starts + np.arange(total, dtype=np.int64), counts
+
+
+def dependency_levels(store):
+    """
+    Groups tasks by dependency level: level 0 holds tasks without predecessors, and a
+    task sits one level below its deepest predecessor. Each level is found with array
+    operations over the previous level's outgoing edges.
+    Returns:
+        list: One int64 array of task ids per level. Covers fewer tasks than the store
+        when the dependencies contain a cycle.
+    """
+    succ_ptr, succ_idx, _ = store.successor_csr()
+    indegree = np.diff(store.pred_ptr)
+    frontier = np.flatnonzero(indegree == 0)
+    levels = []
+    while frontier.size:
+        levels.append(frontier)
+        edges, _ = _edge_ranges(succ_ptr, frontier)
+        targets = succ_idx[edges]
+        np.subtract.at(indegree, targets, 1)
+        frontier = np.unique(targets[indegree[targets] == 0])
+    return levels
+
+
+def schedule_by_level(store, calendar, project_start):
+    """
+    Schedules a TaskStore one dependency level at a time with ``np.busday_offset``:
+    every task in a level gets its start (latest predecessor end plus lag) and end in
+    a single array operation. Gives the same dates as ``TaskStore.schedule``; it pays
+    off on wide plans, while long chains are better served by the per-task pass.
+    Args:
+        store (TaskStore): The tasks to schedule; ``start``/``end`` are filled in as ordinals.
+        calendar (WorkCalendar): The plan's working-day calendar.
+        project_start (datetime): The first working day of the project.
+    Returns:
+        list: Task ids in level order. Shorter than the store on a cycle, in which
+        case ``start``/``end`` are left unset.
+    """
+    n = len(store)
+    levels = dependency_levels(store)
+    order = np.concatenate(levels).tolist() if levels else []
+    if len(order) < n or n == 0:
+        return order
+
+    busdaycal = busday_calendar(calendar)
+    start = np.empty(n, dtype='datetime64[D]')
+    end = np.empty(n, dtype='datetime64[D]')
+    start[levels[0]] = np.datetime64(project_start.date(), 'D')
+    end[levels[0]] = end_dates(start[levels[0]], store.durations[levels[0]], busdaycal)
+
+    for tasks in levels[1:]:
+        edges, counts = _edge_ranges(store.pred_ptr, tasks)
+        predecessors = store.pred_idx[edges]
+        # A successor starts lag + 1 working days after the predecessor's last day
+        candidates = np.busday_offset(end[predecessors] + 1, store.pred_lag[edges],
+                                      roll='forward', busdaycal=busdaycal)
+        group_offsets = np.cumsum(counts) - counts
+        start[tasks] = np.maximum.reduceat(candidates.astype(np.int64), group_offsets).astype('datetime64[D]')
+        end[tasks] = end_dates(start[tasks], store.durations[tasks], busdaycal)
+
+    store.start = start.astype(np.int64) + _EPOCH_ORDINAL
+    store.end = end.astype(np.int64) + _EPOCH_ORDINAL
+    return order
@@ -0,0 +1,148 @@
+from contextlib import contextmanager
+import threading
+import time
+
+# Phases a timeline request goes through, in order
+PHASES = ('parse', 'calendar', 'schedule', 'plot', 'savefig', 'encode')
+
+# Phases that run inside a render worker; the RenderService reports them for every render
+WORKER_PHASES = ('plot', 'savefig')
+
+PHASE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000, 100000)
+
+
+# --- Phase Timers ---
+@contextmanager
+def timed(timings, phase):
+    """
+    Adds the wall time spent in the block to ``timings[phase]`` (seconds).
+    Does nothing when ``timings`` is None, so callers can make timing optional.
+    """
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+
+
+def server_timing_header(timings):
+    """ Formats phase timings as a ``Server-Timing`` header value (durations in ms). """
+    ordered = [p for p in PHASES if p in timings] + [p for p in timings if p not in PHASES]
+    return ', '.join(f"{phase};dur={timings[phase] * 1000:.2f}" for phase in ordered)
+
+
+# --- Prometheus Text Exposition ---
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{v}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """ A Prometheus histogram with cumulative buckets, optionally split by labels. """
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._series = {}  # label values -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+            for label_values, values in series:
+                for bound, count in zip(self.buckets, values):
+                    le = _format_labels(self.labels + ('le',), label_values + (_format_value(bound),))
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                inf = _format_labels(self.labels + ('le',), label_values + ('+Inf',))
+                lines.append(f"{self.name}_bucket{inf} {values[-2]}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(values[-1])}")
+                lines.append(f"{self.name}_count{labels} {values[-2]}")
+        return lines
+
+
+class Counter:
+    """ A Prometheus counter, optionally split by labels. """
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+# --- Timeline Metrics ---
+class TimelineMetrics:
+    """
+    Per-process metrics for the timeline endpoints, exposed at ``/metrics``.
+    Safe to update from request threads and executor callbacks at the same time.
+    """
+
+    def __init__(self):
+        self.phase_seconds = Histogram(
+            'timeline_phase_seconds', 'Time spent in each phase of a timeline request.',
+            PHASE_BUCKETS, labels=('phase',))
+        self.request_tasks = Histogram(
+            'timeline_request_tasks', 'Number of tasks per timeline request.', SIZE_BUCKETS)
+        self.request_holidays = Histogram(
+            'timeline_request_holidays', 'Number of holidays per timeline request.', SIZE_BUCKETS)
+        self.requests = Counter(
+            'timeline_requests_total', 'Timeline requests by endpoint and status code.',
+            labels=('endpoint', 'status'))
+
+    def observe_phases(self, timings, exclude=()):
+        """ Records one observation per phase in ``timings`` ({phase: seconds}). """
+        for phase, seconds in timings.items():
+            if phase not in exclude:
+                self.phase_seconds.observe(seconds, phase)
+
+    def observe_request(self, endpoint, status, plan_size=None):
+        """ Counts a finished request; ``plan_size`` is (tasks, holidays) when a plan was parsed. """
+        self.requests.inc(endpoint, str(status))
+        if plan_size is not None:
+            self.request_tasks.observe(plan_size[0])
+            self.request_holidays.observe(plan_size[1])
+
+    def render(self, extra_lines=()):
+        """ The Prometheus text exposition of every metric. """
+        lines = []
+        for metric in (self.phase_seconds, self.request_tasks, self.request_holidays, self.requests):
+            lines.extend(metric.render())
+        lines.extend(extra_lines)
+        return '\n'.join(lines) + '\n'
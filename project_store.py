@@ -0,0 +1,217 @@
+from datetime import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+
+# Project ids appear in URLs; keep them short and path-safe
+PROJECT_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS project_versions (
+    project_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    plan TEXT NOT NULL,
+    body TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (project_id, version)
+);
+CREATE TABLE IF NOT EXISTS artefacts (
+    project_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    image BLOB NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (project_id, version, format)
+);
+"""
+
+
+def check_project_id(project_id):
+    """
+    Raises:
+        ValueError: If ``project_id`` is not 1-64 letters, digits, '_', '.' or '-'.
+    """
+    if not isinstance(project_id, str) or not PROJECT_ID_PATTERN.match(project_id):
+        raise ValueError("Project id must be 1-64 letters, digits, '_', '.' or '-', starting with a letter or digit")
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+# --- SQLite Project Store ---
+class ProjectStore:
+    """
+    Saved projects in a local SQLite file, shared by every worker process on the host.
+
+    Each save whose plan fingerprint differs from the current one becomes a new
+    version holding the plan payload and the serialised schedule response. Rendered
+    images are stored per version and format; a new version deletes the images of
+    older ones, so a changed plan or calendar never serves a stale chart.
+    """
+
+    def __init__(self, path, keep_versions=10):
+        """
+        Args:
+            path (str): SQLite database file, created on first use.
+            keep_versions (int): Plan/schedule versions kept per project (at least 1).
+        """
+        self.path = path
+        self.keep_versions = max(1, keep_versions)
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _conn(self):
+        """ One connection per thread; transactions are opened explicitly. """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL') # Readers do not block the writer
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def save(self, project_id, fingerprint, plan_json, build_body):
+        """
+        Stores a plan as the project's next version, unless its fingerprint matches
+        the current version.
+        Args:
+            project_id (str): The project key.
+            fingerprint (str): ``plan_fingerprint`` of the parsed plan (covers the calendar).
+            plan_json (str): The plan payload as sent by the client.
+            build_body (callable): ``build_body(version)`` -> (summary_json, body_json);
+                called inside the write transaction, only when a version is created.
+        Returns:
+            tuple: (version, created) where ``created`` is False for an unchanged plan.
+        Raises:
+            ValueError: If the project id is malformed.
+        """
+        check_project_id(project_id)
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE') # Serialises concurrent saves of the same project
+        try:
+            row = conn.execute('SELECT version, fingerprint FROM projects WHERE id = ?', (project_id,)).fetchone()
+            if row is not None and row[1] == fingerprint:
+                conn.execute('COMMIT')
+                return row[0], False
+
+            version = (row[0] if row else 0) + 1
+            summary_json, body_json = build_body(version)
+            now = _now()
+            conn.execute('INSERT INTO project_versions VALUES (?, ?, ?, ?, ?, ?)',
+                         (project_id, version, fingerprint, plan_json, body_json, now))
+            conn.execute('INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?)',
+                         (project_id, version, fingerprint, summary_json, now))
+            conn.execute('DELETE FROM artefacts WHERE project_id = ? AND version < ?', (project_id, version))
+            conn.execute('DELETE FROM project_versions WHERE project_id = ? AND version <= ?',
+                         (project_id, version - self.keep_versions))
+            conn.execute('COMMIT')
+            return version, True
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get(self, project_id, version=None):
+        """
+        Returns the current (or the given) version of a project as a dict with
+        'id', 'version', 'fingerprint', 'plan' and 'body' (both JSON text) and
+        'created_at'; None if it does not exist.
+        """
+        check_project_id(project_id)
+        if version is None:
+            query = ('SELECT v.version, v.fingerprint, v.plan, v.body, v.created_at FROM projects p '
+                     'JOIN project_versions v ON v.project_id = p.id AND v.version = p.version WHERE p.id = ?')
+            row = self._conn().execute(query, (project_id,)).fetchone()
+        else:
+            query = ('SELECT version, fingerprint, plan, body, created_at FROM project_versions '
+                     'WHERE project_id = ? AND version = ?')
+            row = self._conn().execute(query, (project_id, version)).fetchone()
+        if row is None:
+            return None
+        return {'id': project_id, 'version': row[0], 'fingerprint': row[1],
+                'plan': row[2], 'body': row[3], 'created_at': row[4]}
+
+    def head(self, project_id):
+        """ The current version's metadata: {'version', 'fingerprint', 'summary', 'updated_at'} or None. """
+        check_project_id(project_id)
+        row = self._conn().execute('SELECT version, fingerprint, summary, updated_at FROM projects WHERE id = ?',
+                                   (project_id,)).fetchone()
+        if row is None:
+            return None
+        return {'version': row[0], 'fingerprint': row[1], 'summary': json.loads(row[2]), 'updated_at': row[3]}
+
+    def versions(self, project_id):
+        """ Stored versions of a project, newest first: [{'version', 'fingerprint', 'created_at'}, ...]. """
+        check_project_id(project_id)
+        rows = self._conn().execute(
+            'SELECT version, fingerprint, created_at FROM project_versions WHERE project_id = ? ORDER BY version DESC',
+            (project_id,)).fetchall()
+        return [{'version': v, 'fingerprint': f, 'created_at': c} for v, f, c in rows]
+
+    def list(self, project_ids=None):
+        """ Current metadata of every project (or of ``project_ids``), ordered by id. """
+        query = 'SELECT id, version, fingerprint, summary, updated_at FROM projects'
+        params = []
+        if project_ids is not None:
+            if not project_ids:
+                return []
+            for project_id in project_ids:
+                check_project_id(project_id)
+            query += f" WHERE id IN ({','.join('?' * len(project_ids))})"
+            params = list(project_ids)
+        rows = self._conn().execute(query + ' ORDER BY id', params).fetchall()
+        return [{'id': i, 'version': v, 'fingerprint': f, 'summary': json.loads(s), 'updated_at': u}
+                for i, v, f, s, u in rows]
+
+    def get_artefact(self, project_id, version, fmt):
+        """ The stored image bytes for a version and format, or None. """
+        check_project_id(project_id)
+        row = self._conn().execute(
+            'SELECT image FROM artefacts WHERE project_id = ? AND version = ? AND format = ?',
+            (project_id, version, fmt)).fetchone()
+        return row[0] if row else None
+
+    def put_artefact(self, project_id, version, fmt, image_bytes):
+        """
+        Stores a rendered image, but only while ``version`` is still the current one,
+        so a render that finishes after the plan changed is dropped.
+        Returns:
+            bool: True if the image was stored.
+        """
+        check_project_id(project_id)
+        cursor = self._conn().execute(
+            'INSERT OR REPLACE INTO artefacts SELECT id, version, ?, ?, ? FROM projects WHERE id = ? AND version = ?',
+            (fmt, sqlite3.Binary(image_bytes), _now(), project_id, version))
+        return cursor.rowcount > 0
+
+    def delete(self, project_id):
+        """ Removes a project with all its versions and images. Returns False if it did not exist. """
+        check_project_id(project_id)
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            deleted = conn.execute('DELETE FROM projects WHERE id = ?', (project_id,)).rowcount
+            conn.execute('DELETE FROM project_versions WHERE project_id = ?', (project_id,))
+            conn.execute('DELETE FROM artefacts WHERE project_id = ?', (project_id,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return deleted > 0
@@ -0,0 +1,188 @@
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import threading
+
+# Bump when the rendered output changes for the same plan, so stale entries are ignored
+CACHE_VERSION = 1
+
+
+# --- Cache Keys ---
+def plan_fingerprint(plan, **options):
+    """
+    Canonical hash of a parsed plan plus render options (format, dpi, ...).
+    Two payloads that parse to the same plan produce the same key, whatever their
+    key order, whitespace, or whether defaults were sent explicitly.
+    Args:
+        plan (dict): A plan returned by ``scheduler.parse_plan``.
+        **options: Output options that change the rendered bytes.
+    Returns:
+        str: A hex SHA-256 digest.
+    """
+    canonical = {
+        'version': CACHE_VERSION,
+        'project_name': plan['project_name'],
+        'start_date': plan['start_date'].strftime('%Y-%m-%d'),
+        'weekly_holiday': plan['weekly_holiday'],
+        'holidays': [
+            [h['start'].strftime('%Y-%m-%d'), h['end'].strftime('%Y-%m-%d'), h['name'], h['color']]
+            for h in plan['holidays']
+        ],
+        'tasks': [
+            [t['name'], t['duration'], sorted(t['depends_on'])]
+            for t in plan['tasks']
+        ],
+        'options': options,
+    }
+    if plan.get('analyze_critical_path'):
+        canonical['critical_path'] = True # Only when set, so existing keys stay valid
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+# --- In-Memory LRU ---
+class LRUCache:
+    """ Thread-safe mapping that keeps the ``max_entries`` most recently used keys. """
+
+    def __init__(self, max_entries):
+        """
+        Args:
+            max_entries (int): Entries kept (0 disables the cache).
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """ Returns the value for ``key`` (marking it recently used), or None. """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# --- Two-Tier Render Cache ---
+class RenderCache:
+    """
+    Bounded LRU of rendered timelines with an optional on-disk tier.
+    Each entry is ``(meta, image_bytes)`` where ``meta`` is the JSON-serialisable
+    schedule summary returned alongside the image.
+    """
+
+    def __init__(self, max_entries=128, disk_dir=None, disk_max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            max_entries (int): Entries kept in memory (0 disables the memory tier).
+            disk_dir (str, optional): Directory for the disk tier; None disables it.
+            disk_max_bytes (int): Size budget of the disk tier, enforced oldest-first.
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = LRUCache(max_entries)
+        self._lock = threading.Lock() # Guards the hit/miss counters
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key):
+        """ Returns ``(meta, image_bytes)`` or None. Disk hits are promoted to memory. """
+        entry = self._memory.get(key)
+        if entry is None:
+            entry = self._disk_get(key)
+            if entry is not None:
+                self._memory.put(key, entry)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, key, meta, image_bytes):
+        entry = (meta, image_bytes)
+        self._memory.put(key, entry)
+        self._disk_put(key, entry)
+
+    def clear(self):
+        self._memory.clear()
+
+    # --- Disk tier ---
+    def _paths(self, key):
+        return os.path.join(self.disk_dir, f"{key}.img"), os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        image_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(image_path, 'rb') as f:
+                image_bytes = f.read()
+            os.utime(image_path) # Mark as recently used for eviction
+            return meta, image_bytes
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key, entry):
+        if not self.disk_dir:
+            return
+        meta, image_bytes = entry
+        image_path, meta_path = self._paths(key)
+        try:
+            # Write to temp files and rename so readers never see partial entries
+            for path, mode, payload in ((image_path, 'wb', image_bytes),
+                                        (meta_path, 'w', json.dumps(meta))):
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, mode) as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            self._disk_evict()
+        except OSError as e:
+            logging.warning(f"Could not write render cache entry {key}: {e}")
+
+    def _disk_evict(self):
+        """ Removes least recently used entries until the disk tier fits its budget. """
+        files = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.img'):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            meta_path = path[:-4] + '.json'
+            size = stat.st_size + (os.path.getsize(meta_path) if os.path.exists(meta_path) else 0)
+            files.append((stat.st_mtime, path, meta_path, size))
+            total += size
+
+        files.sort()
+        for _, path, meta_path, size in files:
+            if total <= self.disk_max_bytes:
+                break
+            for p in (path, meta_path):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from render_service import RenderQueueFull
+
+
+# --- Job Storage Backends ---
+class MemoryJobBackend:
+    """ Keeps jobs and their images in this process. """
+
+    def __init__(self):
+        self._jobs = {}
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def save(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def save_image(self, job_id, image_bytes):
+        with self._lock:
+            self._images[job_id] = image_bytes
+
+    def get_image(self, job_id):
+        with self._lock:
+            return self._images.get(job_id)
+
+    def delete(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._images.pop(job_id, None)
+
+    def job_ids(self):
+        with self._lock:
+            return list(self._jobs)
+
+
+class DirectoryJobBackend:
+    """
+    Stores each job as ``<id>.json`` plus ``<id>.img`` in a local directory, so any
+    worker process on the host can answer status and image requests.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id, suffix):
+        # Job ids are uuid4 hex strings; refuse anything else to keep paths inside the directory
+        if not (len(job_id) == 32 and all(c in '0123456789abcdef' for c in job_id)):
+            return None
+        return os.path.join(self.directory, f"{job_id}.{suffix}")
+
+    def _write(self, path, mode, payload):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, mode) as f:
+            f.write(payload)
+        os.replace(tmp_path, path) # Readers never see a partial file
+
+    def save(self, job):
+        self._write(self._path(job['id'], 'json'), 'w', json.dumps(job))
+
+    def get(self, job_id):
+        path = self._path(job_id, 'json')
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_image(self, job_id, image_bytes):
+        self._write(self._path(job_id, 'img'), 'wb', image_bytes)
+
+    def get_image(self, job_id):
+        path = self._path(job_id, 'img')
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def delete(self, job_id):
+        for suffix in ('json', 'img'):
+            path = self._path(job_id, suffix)
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def job_ids(self):
+        return [name[:-5] for name in os.listdir(self.directory) if name.endswith('.json')]
+
+
+# --- Asynchronous Render Jobs ---
+class JobManager:
+    """
+    Queues renders on the RenderService and records their results in a backend.
+    A job is created with its schedule already computed; only the image is deferred.
+    Jobs (finished or not) are dropped ``ttl`` seconds after their last update. Workers
+    stop a render after the service's ``timeout``; as a backstop, a job still pending
+    after ``job_deadline()`` seconds (which allows for queueing) is reported as failed.
+    """
+
+    def __init__(self, render_service, render_cache, backend=None, ttl=600):
+        """
+        Args:
+            render_service (RenderService): Where renders run.
+            render_cache (RenderCache): Finished images are shared with the sync endpoints.
+            backend: A job backend (defaults to MemoryJobBackend).
+            ttl (float): Seconds a job is kept after it was last updated.
+        """
+        self.render_service = render_service
+        self.render_cache = render_cache
+        self.backend = backend or MemoryJobBackend()
+        self.ttl = ttl
+        self._last_purge = 0.0
+
+    def create(self, plan, schedule, summary, fmt, dpi, cache_key):
+        """
+        Creates a job for an already computed schedule and starts rendering it.
+        Returns:
+            dict: The job record.
+        Raises:
+            RenderQueueFull: If the render queue has no free slot.
+        """
+        self.purge_expired()
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'pending',
+            'created': now,
+            'updated': now,
+            'format': fmt,
+            'summary': summary,
+            'error': None,
+        }
+
+        cached = self.render_cache.get(cache_key)
+        if cached is not None:
+            self.backend.save_image(job['id'], cached[1])
+            job['status'] = 'done'
+            self.backend.save(job)
+            return job
+
+        self.backend.save(job)
+        try:
+            future = self.render_service.submit(plan, schedule, fmt, dpi)
+        except RenderQueueFull:
+            self.backend.delete(job['id'])
+            raise
+        future.add_done_callback(lambda f: self._finish(job['id'], f, summary, cache_key))
+        return job
+
+    def _finish(self, job_id, future, summary, cache_key):
+        """ Records the outcome of a render future (runs on the executor's thread). """
+        try:
+            image_bytes = future.result()
+            error = None
+        except Exception as e:
+            image_bytes = None
+            error = str(e) or e.__class__.__name__
+        if image_bytes is not None:
+            # Cached even if the job is gone, so the render is not wasted
+            self.render_cache.put(cache_key, summary, image_bytes)
+
+        job = self.backend.get(job_id)
+        if job is None or job['status'] != 'pending':
+            return # Expired, deleted or timed out while rendering
+        if error is not None:
+            logging.error(f"Render job {job_id} failed: {error}")
+            job['status'] = 'failed'
+            job['error'] = error
+        else:
+            self.backend.save_image(job_id, image_bytes)
+            job['status'] = 'done'
+        job['updated'] = time.time()
+        self.backend.save(job)
+
+    def get(self, job_id):
+        self.purge_expired()
+        return self._check_timeout(self.backend.get(job_id))
+
+    def job_deadline(self):
+        """
+        Seconds after which a pending job is given up. Every render ahead of it in the
+        queue is stopped by its worker after ``timeout``, so a job waits at most one
+        timeout per queued render per worker before its own render starts.
+        """
+        service = self.render_service
+        return service.timeout * (2 + -(-service.queue_size // max(1, service.workers)))
+
+    def _check_timeout(self, job):
+        """ Marks a pending job failed once it is older than ``job_deadline()``. """
+        deadline = self.job_deadline()
+        if job is None or job['status'] != 'pending' or time.time() - job['created'] <= deadline:
+            return job
+        logging.error(f"Render job {job['id']} still pending after {deadline:g}s.")
+        job['status'] = 'failed'
+        job['error'] = f"Rendering did not finish within {deadline:g} seconds."
+        job['updated'] = time.time()
+        self.backend.save(job)
+        return job
+
+    def get_image(self, job_id):
+        job = self.get(job_id)
+        if job is None or job['status'] != 'done':
+            return job, None
+        return job, self.backend.get_image(job_id)
+
+    def purge_expired(self):
+        """ Drops jobs older than the TTL. Runs at most once per second. """
+        now = time.time()
+        if now - self._last_purge < 1:
+            return
+        self._last_purge = now
+        for job_id in self.backend.job_ids():
+            job = self.backend.get(job_id)
+            if job is not None and now - job['updated'] > self.ttl:
+                self.backend.delete(job_id)
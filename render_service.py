@@ -0,0 +1,211 @@
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import logging
+import multiprocessing
+import signal
+import threading
+
+from renderer import render_timeline
+
+
+class RenderQueueFull(Exception):
+    """ Raised when the render queue is at capacity. ``retry_after`` is a hint in seconds. """
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__("Render queue is full, try again later.")
+
+
+class RenderTimeout(Exception):
+    """ Raised when a render job does not finish within its timeout. """
+
+
+def _call_with_deadline(timeout, fn, *args):
+    """
+    Worker entry point for every pool job: runs ``fn(*args)`` and raises RenderTimeout
+    inside the worker once ``timeout`` seconds have passed, so a slow render frees its
+    process and queue slot instead of running on after the caller gave up. Needs SIGALRM
+    and the process's main thread (where pool workers run jobs); otherwise no deadline.
+    """
+    if not timeout or not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        return fn(*args)
+
+    def expire(signum, frame):
+        raise RenderTimeout(f"Rendering did not finish within {timeout} seconds.")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _render_timed(plan, schedule, fmt, dpi):
+    """ Worker entry point: the image plus its {'plot', 'savefig'} phase times. """
+    timings = {}
+    image_bytes = render_timeline(plan, schedule, fmt, dpi, timings=timings)
+    return image_bytes, timings
+
+
+# --- Process-Pool Render Service ---
+class RenderService:
+    """
+    Runs ``render_timeline`` in a pool of worker processes.
+    Each render holds its own interpreter (and GIL), so one web front end can keep every
+    core busy. At most ``workers + queue_size`` jobs are accepted at once; further
+    submissions fail fast with RenderQueueFull instead of piling up behind the pool.
+    With ``workers=0`` renders run inline in the calling thread (useful for debugging).
+    """
+
+    def __init__(self, workers=2, queue_size=8, timeout=60, retry_after=5, on_timings=None):
+        """
+        Args:
+            workers (int): Worker processes (0 renders in-process).
+            queue_size (int): Jobs allowed to wait for a free worker.
+            timeout (float): Seconds a caller waits for one render; a worker also stops
+                a job after it has run this long.
+            retry_after (int): Retry-After hint returned when the queue is full.
+            on_timings (callable, optional): Called with the phase timings of every finished render.
+        """
+        self.workers = workers
+        self.on_timings = on_timings
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max(1, workers) + queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """ Starts the pool on first use, or again after a worker crashed. """
+        with self._lock:
+            if self._executor is None:
+                if self.workers <= 0:
+                    # Inline mode: queued jobs run on one background thread in this process
+                    self._executor = ThreadPoolExecutor(max_workers=1)
+                else:
+                    # 'spawn' avoids forking a threaded WSGI process with locks held
+                    context = multiprocessing.get_context('spawn')
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def submit_call(self, fn, *args, block=False):
+        """
+        Queues ``fn(*args)`` on the pool and returns its Future. ``fn`` must be a
+        module-level function so worker processes can import it. The worker raises
+        RenderTimeout if it runs longer than ``timeout`` seconds.
+        Args:
+            block (bool): Wait up to ``timeout`` seconds for a free slot instead of failing.
+        Raises:
+            RenderQueueFull: If all worker and queue slots are taken.
+        """
+        acquired = self._slots.acquire(timeout=self.timeout) if block else self._slots.acquire(blocking=False)
+        if not acquired:
+            raise RenderQueueFull(self.retry_after)
+        try:
+            try:
+                future = self._get_executor().submit(_call_with_deadline, self.timeout, fn, *args)
+            except BrokenProcessPool:
+                self._reset_executor()
+                future = self._get_executor().submit(_call_with_deadline, self.timeout, fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _record_timings(self, phase_timings, timings):
+        if timings is not None:
+            timings.update(phase_timings)
+        if self.on_timings is not None:
+            self.on_timings(phase_timings)
+
+    def submit(self, plan, schedule, fmt='png', dpi=200, block=False, timings=None):
+        """
+        Queues a render and returns a Future resolving to the image bytes.
+        Args:
+            timings (dict, optional): Receives the render's phase times before the Future resolves.
+        Raises:
+            RenderQueueFull: If all worker and queue slots are taken.
+        """
+        inner = self.submit_call(_render_timed, plan, schedule, fmt, dpi, block=block)
+        outer = Future()
+
+        def unwrap(f):
+            if outer.cancelled():
+                return
+            if f.cancelled():
+                outer.cancel()
+            elif f.exception() is not None:
+                outer.set_exception(f.exception())
+            else:
+                image_bytes, phase_timings = f.result()
+                self._record_timings(phase_timings, timings)
+                outer.set_result(image_bytes)
+
+        inner.add_done_callback(unwrap)
+        outer.add_done_callback(lambda f: f.cancelled() and inner.cancel())
+        return outer
+
+    def render(self, plan, schedule, fmt='png', dpi=200, timings=None):
+        """
+        Renders a timeline and waits for the result.
+        Args:
+            timings (dict, optional): Receives the 'plot' and 'savefig' phase times.
+        Raises:
+            RenderQueueFull: If all worker and queue slots are taken.
+            RenderTimeout: If the job takes longer than ``timeout`` seconds.
+        """
+        if self.workers <= 0:
+            if not self._slots.acquire(blocking=False):
+                raise RenderQueueFull(self.retry_after)
+            try:
+                image_bytes, phase_timings = _render_timed(plan, schedule, fmt, dpi)
+            finally:
+                self._slots.release()
+            self._record_timings(phase_timings, timings)
+            return image_bytes
+
+        return self._wait(self.submit(plan, schedule, fmt, dpi, timings=timings))
+
+    def call(self, fn, *args):
+        """
+        Runs ``fn(*args)`` on the pool (inline when ``workers=0``) and waits for the result.
+        Used for render functions other than ``render_timeline``, such as tiles.
+        Raises:
+            RenderQueueFull: If all worker and queue slots are taken.
+            RenderTimeout: If the call takes longer than ``timeout`` seconds.
+        """
+        if self.workers <= 0:
+            if not self._slots.acquire(blocking=False):
+                raise RenderQueueFull(self.retry_after)
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+        return self._wait(self.submit_call(fn, *args))
+
+    def _wait(self, future):
+        """ Waits for a pool future, mapping timeouts and crashed workers. """
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # A queued job is dropped; a running one is stopped by its worker's own deadline
+            future.cancel()
+            logging.error(f"Render job exceeded {self.timeout}s timeout.")
+            raise RenderTimeout(f"Rendering did not finish within {self.timeout} seconds.")
+        except BrokenProcessPool:
+            logging.error("Render worker crashed; restarting the pool.")
+            self._reset_executor()
+            raise
+
+    def shutdown(self):
+        self._reset_executor()
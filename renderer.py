@@ -0,0 +1,400 @@
+import matplotlib
+matplotlib.use('Agg')  # Headless backend; figures are never shown
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection, PolyCollection
+from datetime import datetime, timedelta
+import numpy as np
+import io
+import logging
+
+from metrics import timed
+
+# Plans with more tasks than this use the collection-based fast path by default
+FAST_RENDER_THRESHOLD = 40
+
+# Full charts grow 0.6 in per task; lower the DPI rather than exceed this many pixels
+# (Agg cannot draw past 2**16 px and a bigger PNG is useless in a browser anyway)
+MAX_IMAGE_PIXELS = 32768
+
+# Task categories and colors (Simplified - apply color cyclically or based on some logic if needed)
+# Example: cycle through a predefined list of colors
+PLOT_COLORS = ['#3498db', '#e74c3c', '#1abc9c', '#9b59b6', '#f1c40f',
+               '#2ecc71', '#e67e22', '#34495e', '#16a085', '#d35400']
+
+# Outline of critical-path tasks when the schedule carries CPM fields
+CRITICAL_EDGE_COLOR = '#c0392b'
+CRITICAL_EDGE_WIDTH = 2.5
+
+
+# --- Classic Path (one artist per task / holiday) ---
+def _draw_tasks(ax, tasks):
+    """ Draws each task as its own bar plus a boxed duration label. Returns the plotted rows. """
+    num_colors = len(PLOT_COLORS)
+
+    # Plotting each task as a bar
+    plotted_indices = [] # Keep track of y-positions used
+    for i, task in enumerate(tasks):
+        if task['start_date'] is None or task['end_date'] is None:
+            logging.warning(f"Skipping plotting task '{task['name']}' as dates were not calculated.")
+            continue
+
+        start_num = mdates.date2num(task['start_date'])
+        end_num = mdates.date2num(task['end_date'])
+
+        # Use barh with numeric dates; width is end_num - start_num + 1 (to include the end day)
+        critical = task.get('critical', False)
+        ax.barh(i, end_num - start_num + 1, left=start_num, height=0.6, align='center',
+                color=PLOT_COLORS[i % num_colors], alpha=0.85,
+                edgecolor=CRITICAL_EDGE_COLOR if critical else 'black',
+                linewidth=CRITICAL_EDGE_WIDTH if critical else None,
+                label=task['name'] if i < 5 else "") # Label only first few to avoid clutter
+
+        # Add duration text inside the bar
+        text_x_num = start_num + (end_num - start_num + 1) / 2
+        ax.text(mdates.num2date(text_x_num), i, f"{task['duration']}d", # Use original task duration
+                ha='center', va='center', color='white', fontweight='bold',
+                fontsize=9, bbox=dict(facecolor=PLOT_COLORS[i % num_colors], alpha=0.9, boxstyle="round,pad=0.2",edgecolor='none'))
+        plotted_indices.append(i)
+    return plotted_indices
+
+
+def _draw_holidays(ax, holidays, plotted_indices):
+    """ Draws one shaded span and two dotted edge lines per holiday. """
+    if not (holidays and plotted_indices):
+        return
+    min_y_axis, max_y_axis = ax.get_ylim() # Get current y-limits
+    min_plotted_y, max_plotted_y = min(plotted_indices), max(plotted_indices)
+    # Calculate relative positions for axvspan
+    y_min_rel = (min_plotted_y - 0.5 - min_y_axis) / (max_y_axis - min_y_axis)
+    y_max_rel = (max_plotted_y + 0.5 - min_y_axis) / (max_y_axis - min_y_axis)
+
+    for holiday in holidays:
+        h_start_num = mdates.date2num(holiday['start'])
+        h_end_num = mdates.date2num(holiday['end'])
+        # Draw vertical span covering the plotted task area
+        # Add 1 to end_num because axvspan excludes the endpoint date visually
+        ax.axvspan(h_start_num, h_end_num + 1, ymin=y_min_rel, ymax=y_max_rel,
+                   color=holiday['color'], alpha=0.2, zorder=-1) # Behind tasks
+
+        # Optionally add vertical lines at start/end
+        ax.axvline(x=h_start_num, color=holiday['color'], linestyle=':', alpha=0.6, linewidth=1)
+        ax.axvline(x=h_end_num+1, color=holiday['color'], linestyle=':', alpha=0.6, linewidth=1)
+
+
+# --- Fast Path (one collection for all tasks / holidays) ---
+def _rectangles(left, right, bottom, top):
+    """ Builds an (n, 4, 2) vertex array of axis-aligned rectangles. """
+    return np.stack([
+        np.column_stack([left, bottom]),
+        np.column_stack([left, top]),
+        np.column_stack([right, top]),
+        np.column_stack([right, bottom]),
+    ], axis=1)
+
+
+def _draw_tasks_fast(ax, tasks):
+    """ Draws every task bar as a single PolyCollection built from NumPy arrays. """
+    plotted = [(i, t) for i, t in enumerate(tasks) if t['start_date'] is not None and t['end_date'] is not None]
+    if not plotted:
+        return []
+    rows = np.array([i for i, _ in plotted], dtype=float)
+    starts = mdates.date2num([t['start_date'] for _, t in plotted])
+    ends = mdates.date2num([t['end_date'] for _, t in plotted]) + 1 # Include the end day
+
+    colors = [PLOT_COLORS[int(i) % len(PLOT_COLORS)] for i in rows]
+    critical = [t.get('critical', False) for _, t in plotted]
+    bars = PolyCollection(_rectangles(starts, ends, rows - 0.3, rows + 0.3), facecolors=colors,
+                          edgecolors=[CRITICAL_EDGE_COLOR if c else 'black' for c in critical],
+                          linewidths=[CRITICAL_EDGE_WIDTH if c else 0.8 for c in critical], alpha=0.85)
+    ax.add_collection(bars)
+
+    # Plain duration labels (no bbox); the bar colour already provides the background
+    centers = (starts + ends) / 2
+    for x, y, (_, task) in zip(centers, rows, plotted):
+        ax.text(x, y, f"{task['duration']}d", ha='center', va='center',
+                color='white', fontweight='bold', fontsize=9)
+    return [int(i) for i in rows]
+
+
+def _draw_holidays_fast(ax, holidays, plotted_indices):
+    """ Draws all holiday spans as one PolyCollection and all edge lines as one LineCollection. """
+    if not (holidays and plotted_indices):
+        return
+    y_top, y_bottom = min(plotted_indices) - 0.5, max(plotted_indices) + 0.5
+    starts = mdates.date2num([h['start'] for h in holidays])
+    ends = mdates.date2num([h['end'] for h in holidays]) + 1
+    colors = [h['color'] for h in holidays]
+    n = len(holidays)
+
+    spans = PolyCollection(_rectangles(starts, ends, np.full(n, y_top), np.full(n, y_bottom)),
+                           facecolors=colors, edgecolors='none', alpha=0.2, zorder=-1) # Behind tasks
+    ax.add_collection(spans)
+
+    edges_x = np.concatenate([starts, ends])
+    segments = np.stack([
+        np.column_stack([edges_x, np.full(2 * n, y_top)]),
+        np.column_stack([edges_x, np.full(2 * n, y_bottom)]),
+    ], axis=1)
+    ax.add_collection(LineCollection(segments, colors=colors * 2, linestyles=':', alpha=0.6, linewidths=1))
+
+
+def _set_date_locators(ax, span_days):
+    """ Picks major/minor date locators so tick counts stay bounded on long plans. """
+    if span_days <= 90:
+        ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=1)) # Major ticks weekly
+        ax.xaxis.set_minor_locator(mdates.DayLocator()) # Minor ticks daily
+    elif span_days <= 400:
+        ax.xaxis.set_major_locator(mdates.MonthLocator())
+        ax.xaxis.set_minor_locator(mdates.WeekdayLocator(interval=1))
+    else:
+        ax.xaxis.set_major_locator(mdates.MonthLocator(interval=max(1, span_days // 600 + 1)))
+        ax.xaxis.set_minor_locator(mdates.MonthLocator())
+
+
+def _fixed_layout(fig, task_names):
+    """ Sets margins from estimated label sizes instead of measuring every text artist. """
+    width, height = fig.get_size_inches()
+    longest = max((len(name) for name in task_names), default=0)
+    # ~0.085 in per character at fontsize 10, plus room for the 'Tasks' axis label
+    left_in = min(0.4 * width, 0.5 + 0.085 * longest)
+    bottom_in = 1.4 # Rotated date labels and the 'Date' axis label
+    top_in = 0.6 # Title
+    fig.subplots_adjust(left=left_in / width, right=1 - 0.3 / width,
+                        bottom=0.06 + bottom_in / height, top=0.96 - top_in / height)
+
+
+# --- Timeline Rendering ---
+def render_timeline(plan, schedule, fmt='png', dpi=200, fast=None, timings=None):
+    """
+    Draws the Gantt chart for an already computed schedule.
+    Args:
+        plan (dict): The parsed plan (project name, holidays, weekly holiday).
+        schedule (dict): The result of ``compute_schedule`` for that plan.
+        fmt (str): Output format passed to savefig ('png', 'svg', 'pdf').
+        dpi (int): Output resolution.
+        fast (bool, optional): Use the collection-based path. Defaults to True when
+            the plan has more than FAST_RENDER_THRESHOLD tasks.
+        timings (dict, optional): Receives the 'plot' and 'savefig' phase times in seconds.
+    Returns:
+        bytes: The encoded image.
+    """
+    project_name = plan['project_name']
+    holidays = plan['holidays']
+    correct_weekly_holiday_name = plan['weekly_holiday_name']
+    tasks = schedule['tasks']
+    actual_project_start_date = schedule['project_start']
+    project_end = schedule['project_end']
+    total_days = schedule['total_days']
+    working_days = schedule['working_days']
+    if fast is None:
+        fast = len(tasks) > FAST_RENDER_THRESHOLD
+
+    # --- Plotting ---
+    with timed(timings, 'plot'):
+        # Object-oriented Figure API only: no pyplot global state, so renders are safe to run concurrently
+        fig = Figure(figsize=(15, max(8, len(tasks) * 0.6))) # Adjust height based on tasks
+        ax = fig.subplots()
+
+        task_names = [t['name'] for t in tasks]
+
+        # --- Task Bars and Holiday Period Indications ---
+        if fast:
+            plotted_indices = _draw_tasks_fast(ax, tasks)
+            _draw_holidays_fast(ax, holidays, plotted_indices)
+        else:
+            plotted_indices = _draw_tasks(ax, tasks)
+            _draw_holidays(ax, holidays, plotted_indices)
+
+        # --- Formatting ---
+        ax.set_yticks(range(len(tasks)))
+        ax.set_yticklabels(task_names, fontsize=10)
+        ax.invert_yaxis() # Tasks top-to-bottom
+
+        ax.set_xlabel('Date', fontsize=12, fontweight='bold')
+        ax.set_ylabel('Tasks', fontsize=12, fontweight='bold')
+        ax.set_title(f'{project_name} - Timeline', fontsize=16, fontweight='bold')
+
+        # Format dates on x-axis
+        date_format = mdates.DateFormatter('%b %d, %Y')
+        ax.xaxis.set_major_formatter(date_format)
+        # Weekly/daily ticks up to 90 days, thinned on longer spans whatever the task count
+        _set_date_locators(ax, total_days)
+
+        ax.grid(True, axis='x', linestyle='--', alpha=0.6, which='major') # Grid lines for weeks
+        ax.grid(True, axis='x', linestyle=':', alpha=0.3, which='minor') # Fainter grid lines for days
+
+        # Set x-axis limits with padding
+        if tasks and any(t['start_date'] for t in tasks):
+            plot_start_date = min(t['start_date'] for t in tasks if t['start_date'] is not None)
+            plot_end_date = project_end
+            ax.set_xlim(plot_start_date - timedelta(days=2), plot_end_date + timedelta(days=2))
+        else: # Handle empty timeline case
+            ax.set_xlim(actual_project_start_date - timedelta(days=2), actual_project_start_date + timedelta(days=10))
+
+
+        # Set y-axis limits (if tasks exist)
+        if plotted_indices:
+            ax.set_ylim(max(plotted_indices) + 0.5, min(plotted_indices) - 0.5) # Inverted axis
+        else:
+             ax.set_ylim(0.5, -0.5) # Handle empty case
+
+        # Set background color
+        ax.set_facecolor('#f8f9fa')
+        fig.patch.set_facecolor('#ffffff')
+
+        # --- Add text annotations for key info ---
+        fig.text(0.02, 0.03, f"Start: {actual_project_start_date.strftime('%b %d, %Y')}", fontsize=9, fontweight='bold')
+        fig.text(0.30, 0.03, f"End: {project_end.strftime('%b %d, %Y')}", fontsize=9, fontweight='bold')
+        fig.text(0.60, 0.03, f"Duration: {total_days} Cal. Days", fontsize=9, fontweight='bold', color='#2c3e50')
+        # CORRECTED: Use the correct holiday name in the plot annotation
+        fig.text(0.80, 0.03, f"Work Days: {working_days} ({correct_weekly_holiday_name} Off)", fontsize=9, fontweight='bold', color='#2c3e50')
+
+
+        # Rotate date labels for better readability
+        for label in ax.get_xticklabels():
+            label.set_rotation(30)
+            label.set_horizontalalignment('right')
+
+        # Adjust layout
+        if fast:
+            _fixed_layout(fig, task_names) # tight_layout would cost a full extra draw
+        else:
+            fig.tight_layout(rect=[0, 0.06, 1, 0.96]) # Adjust bottom margin for figtext
+
+    # --- Save ---
+    buf = io.BytesIO()
+    dpi = min(dpi, MAX_IMAGE_PIXELS / fig.get_size_inches()[1]) # Use /timeline-tile for huge plans
+    with timed(timings, 'savefig'): # Rasterising/encoding usually dominates the render
+        fig.savefig(buf, format=fmt, dpi=dpi) # Lower DPI slightly if performance is an issue
+    return buf.getvalue()
+
+
+# --- Tiled Rendering (viewport of a large plan) ---
+TILE_ROW_PX = 24 # Height of one row in a tile
+TILE_LABEL_PX = 220 # Left gutter for row labels
+TILE_AXIS_PX = 36 # Bottom gutter for date labels
+SUMMARY_COLOR = '#7f8c8d'
+
+# matplotlib date numbers are days since its epoch; ordinal + offset converts directly
+_ORDINAL_TO_NUM = mdates.date2num(datetime.fromordinal(1)) - 1
+
+
+def tile_row_count(num_tasks, zoom):
+    """ Rows in the plan at a zoom level: zoom 0 is one row per task, zoom z groups 2**z tasks. """
+    return -(-num_tasks // (1 << zoom))
+
+
+def tile_rows(schedule, row_start, row_count, zoom=0):
+    """
+    Collects the bars of one tile: rows [row_start, row_start + row_count) at ``zoom``.
+    At zoom 0 every row is a task; above that each row is a summary bar from the earliest
+    start to the latest end of 2**zoom consecutive tasks. Runs in the web process so only
+    ``row_count`` rows (not the whole schedule) are sent to a render worker.
+    Returns:
+        dict: {'labels', 'start', 'end' (ordinals), 'critical', 'duration', 'count', 'zoom'}
+    """
+    tasks = schedule['tasks']
+    group = 1 << zoom
+    first = min(len(tasks), row_start * group)
+    last = min(len(tasks), (row_start + row_count) * group)
+    covered = tasks[first:last]
+    starts = np.array([t['start_date'].toordinal() for t in covered], dtype=np.int64)
+    ends = np.array([t['end_date'].toordinal() for t in covered], dtype=np.int64)
+    critical = np.array([t.get('critical', False) for t in covered], dtype=bool)
+    if group == 1:
+        return {
+            'labels': [t['name'] for t in covered],
+            'start': starts, 'end': ends, 'critical': critical,
+            'duration': [t['duration'] for t in covered],
+            'count': [1] * len(covered), 'zoom': zoom,
+        }
+
+    offsets = np.arange(0, len(covered), group)
+    counts = np.diff(np.append(offsets, len(covered)))
+    labels = [f"Tasks {first + o + 1}-{first + o + c}" for o, c in zip(offsets.tolist(), counts.tolist())]
+    has_rows = len(covered) > 0
+    return {
+        'labels': labels,
+        'start': np.minimum.reduceat(starts, offsets) if has_rows else starts,
+        'end': np.maximum.reduceat(ends, offsets) if has_rows else ends,
+        'critical': np.logical_or.reduceat(critical, offsets) if has_rows else critical,
+        'duration': None,
+        'count': counts.tolist(), 'zoom': zoom,
+    }
+
+
+def render_tile(rows, holidays, row_count, date_start, date_end, fmt='png', width=1024, labels=True,
+                row_start=0):
+    """
+    Draws one fixed-size tile of the timeline. Tiles with the same ``row_count``, window
+    length and ``width`` share a scale, so a client can lay them out edge to edge.
+    Args:
+        rows (dict): The result of ``tile_rows``.
+        holidays (list): Parsed holidays; only those inside the window are visible.
+        row_count (int): Rows per tile (a short last tile keeps the same row height).
+        date_start (datetime): First day of the window.
+        date_end (datetime): Last day of the window (inclusive).
+        fmt (str): Output format ('png', 'svg', 'pdf').
+        width (int): Tile width in pixels.
+        labels (bool): Draw row and date labels; without them the plot fills the tile.
+        row_start (int): Index of the first row, which keeps bar colours stable while panning.
+    Returns:
+        bytes: The encoded image.
+    """
+    height = row_count * TILE_ROW_PX + (TILE_AXIS_PX if labels else 0)
+    fig = Figure(figsize=(width / 100, height / 100), dpi=100)
+    if labels:
+        ax = fig.add_axes([TILE_LABEL_PX / width, TILE_AXIS_PX / height,
+                           1 - (TILE_LABEL_PX + 8) / width, 1 - TILE_AXIS_PX / height])
+    else:
+        ax = fig.add_axes([0, 0, 1, 1])
+    window_start = date_start.toordinal() + _ORDINAL_TO_NUM
+    window_end = date_end.toordinal() + 1 + _ORDINAL_TO_NUM
+    ax.set_xlim(window_start, window_end)
+    ax.set_ylim(row_count - 0.5, -0.5) # Rows top-to-bottom
+    ax.set_facecolor('#f8f9fa')
+
+    n = len(rows['labels'])
+    if n:
+        y = np.arange(n, dtype=float)
+        left = rows['start'] + _ORDINAL_TO_NUM
+        right = rows['end'] + 1 + _ORDINAL_TO_NUM # Include the end day
+        if rows['zoom'] == 0:
+            colors = [PLOT_COLORS[(row_start + i) % len(PLOT_COLORS)] for i in range(n)]
+        else:
+            colors = [SUMMARY_COLOR] * n
+        critical = rows['critical'].tolist()
+        ax.add_collection(PolyCollection(
+            _rectangles(left, right, y - 0.35, y + 0.35), facecolors=colors, alpha=0.85,
+            edgecolors=[CRITICAL_EDGE_COLOR if c else 'black' for c in critical],
+            linewidths=[CRITICAL_EDGE_WIDTH if c else 0.6 for c in critical]))
+
+        # Bar text only where it fits: duration for tasks, task count for summary rows
+        plot_px = width - (TILE_LABEL_PX + 8 if labels else 0)
+        px_per_day = plot_px / (window_end - window_start)
+        for i in range(n):
+            bar_left, bar_right = max(left[i], window_start), min(right[i], window_end)
+            if (bar_right - bar_left) * px_per_day < 36:
+                continue
+            text = f"{rows['duration'][i]}d" if rows['zoom'] == 0 else f"{rows['count'][i]} tasks"
+            ax.text((bar_left + bar_right) / 2, i, text, ha='center', va='center',
+                    color='white', fontweight='bold', fontsize=8, clip_on=True)
+
+    visible = [h for h in holidays if h['end'] >= date_start and h['start'] <= date_end]
+    _draw_holidays_fast(ax, visible, [0, row_count - 1])
+
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=max(2, width // 140)))
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %d, %Y'))
+    ax.grid(True, axis='x', linestyle='--', alpha=0.6)
+    if labels:
+        ax.set_yticks(range(n))
+        ax.set_yticklabels(rows['labels'], fontsize=8)
+        ax.tick_params(axis='x', labelsize=8)
+    else:
+        ax.set_yticks([])
+        ax.tick_params(axis='x', length=0, labelbottom=False)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=100)
+    return buf.getvalue()
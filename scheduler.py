@@ -0,0 +1,631 @@
+from collections import deque
+from datetime import datetime, timedelta
+import logging
+import os
+
+import numpy as np
+
+from metrics import timed
+from busday_backend import schedule_by_level
+from task_store import TaskStore
+from work_calendar import get_work_calendar
+
+
+class CircularDependencyError(ValueError):
+    """ Raised when task dependencies form a cycle. ``cycle`` holds the task ids in order. """
+
+    def __init__(self, cycle, names):
+        self.cycle = cycle
+        self.names = names
+        super().__init__(f"Circular dependency detected: {' -> '.join(names)}")
+
+
+# 'index' (per-task pass over working-day indices) or 'busday' (np.busday_offset per dependency level)
+SCHEDULER_BACKEND = os.environ.get('SCHEDULER_BACKEND', 'index').lower()
+
+
+# --- Dependency Parsing ---
+def parse_dependencies(task_data, name, num_tasks):
+    """
+    Normalises the dependency fields of one task payload.
+    Accepts the legacy single ``depends_on_index`` and/or a ``depends_on`` list whose
+    entries are either task indexes or ``{"index": i, "lag": n}`` objects, where ``lag``
+    is a finish-to-start lag in working days.
+    Args:
+        task_data (dict): The raw task payload.
+        name (str): The task name (used for log messages).
+        num_tasks (int): Number of tasks in the plan (for range checks).
+    Returns:
+        list: A list of (predecessor_index, lag) tuples without duplicates.
+    """
+    raw_deps = []
+    if task_data.get('depends_on_index') is not None:
+        raw_deps.append(task_data.get('depends_on_index'))
+    depends_on = task_data.get('depends_on') or []
+    if not isinstance(depends_on, list):
+        depends_on = [depends_on]
+    raw_deps.extend(depends_on)
+
+    deps = {}
+    for raw in raw_deps:
+        lag = 0
+        if isinstance(raw, dict):
+            index = raw.get('index')
+            lag = raw.get('lag', 0) or 0
+        else:
+            index = raw
+        try:
+            index = int(index)
+            lag = int(lag)
+        except (ValueError, TypeError):
+            logging.warning(f"Task '{name}' has non-integer dependency {raw}. Ignoring it.")
+            continue
+        if not (0 <= index < num_tasks):
+            logging.warning(f"Task '{name}' has invalid dependency index {index}. Ignoring it.")
+            continue
+        if lag < 0:
+            logging.warning(f"Task '{name}' has negative lag {lag} on task {index}. Using 0.")
+            lag = 0
+        # Keep the largest lag if the same predecessor is listed twice
+        deps[index] = max(lag, deps.get(index, 0))
+    return list(deps.items())
+
+
+# --- Topological Scheduler ---
+def _find_cycle(tasks, remaining):
+    """ Walks predecessors among unscheduled tasks until one repeats; returns the cycle. """
+    start = next(iter(remaining))
+    path, seen = [], {}
+    current = start
+    while current not in seen:
+        seen[current] = len(path)
+        path.append(current)
+        # Every unscheduled task still has at least one unscheduled predecessor
+        current = next(dep for dep, _ in tasks[current]['depends_on'] if dep in remaining)
+    cycle = path[seen[current]:]
+    cycle.reverse()  # Predecessor -> successor order
+    cycle.append(cycle[0])
+    return cycle
+
+
+def _successor_lists(tasks):
+    """ Inverts the 'depends_on' lists: successors[i] = [(successor_index, lag), ...]. """
+    successors = [[] for _ in range(len(tasks))]
+    for task in tasks:
+        for dep, lag in task['depends_on']:
+            successors[dep].append((task['id'], lag))
+    return successors
+
+
+def _successor_start(calendar, predecessor_end, lag):
+    """ A successor starts the first working day after its predecessor ends, plus lag. """
+    return calendar.add_working_days(predecessor_end + timedelta(days=1), lag + 1)
+
+
+def schedule_tasks(tasks, calendar, project_start):
+    """
+    Assigns start and end dates to every task in dependency order (Kahn's algorithm).
+    A task starts on the first working day after all of its predecessors have finished,
+    plus any finish-to-start lag; tasks without predecessors start at ``project_start``.
+    The work happens on a compact TaskStore (integer working-day indices, CSR adjacency)
+    in O(V + E); the dicts are only touched to read the input and write the dates back.
+    With SCHEDULER_BACKEND=busday, each dependency level is scheduled with NumPy
+    business-day arithmetic instead (same dates).
+    Args:
+        tasks (list): Task dicts with 'id', 'name', 'duration' and 'depends_on' [(index, lag), ...].
+        calendar (WorkCalendar): The working-day index for this plan.
+        project_start (datetime): The first working day of the project.
+    Returns:
+        TaskStore: The store the pass ran on, with 'start_date' and 'end_date' also
+        written to every task dict; ``analyze_critical_path`` reuses it.
+    Raises:
+        CircularDependencyError: If the dependencies contain a cycle.
+    """
+    store = TaskStore.from_tasks(tasks)
+    if SCHEDULER_BACKEND == 'busday':
+        order = schedule_by_level(store, calendar, project_start)
+    else:
+        order = store.schedule(calendar, project_start)
+    if len(order) < len(tasks):
+        remaining = set(range(len(tasks))) - set(order)
+        cycle = _find_cycle(tasks, remaining)
+        raise CircularDependencyError(cycle, [tasks[i]['name'] for i in cycle])
+    if not tasks:
+        return store
+
+    # Many tasks share dates, so build each datetime once
+    dates = {}
+    for ordinal in set(store.start.tolist()) | set(store.end.tolist()):
+        dates[ordinal] = datetime.fromordinal(ordinal)
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG) # Skip per-task formatting otherwise
+    for task, start, end in zip(tasks, store.start.tolist(), store.end.tolist()):
+        task['start_date'] = dates[start]
+        task['end_date'] = dates[end]
+        if debug:
+            logging.debug(f"Processed task '{task['name']}': {task['start_date'].strftime('%Y-%m-%d')} -> {task['end_date'].strftime('%Y-%m-%d')}")
+
+    return store
+
+
+# --- Critical Path Analysis ---
+def analyze_critical_path(tasks, calendar, project_start, store=None):
+    """
+    Backward pass (CPM) over a scheduled task list, in working days.
+    The forward pass is the schedule itself: each task's start and end are mapped to
+    working-day indices (0 = ``project_start``) through one table of the project's
+    working days, and the backward pass walks the store's successor CSR arrays. Since
+    a successor always starts after its predecessor ends, visiting tasks by descending
+    early start is a reverse topological order. Lags are finish-to-start, as in
+    ``schedule_tasks``.
+    Adds to every task:
+        'late_start', 'late_finish' (datetime): The latest dates that keep the project end.
+        'total_float' (int): Working days the task can slip without moving the project end.
+        'free_float' (int): Working days it can slip without delaying any successor.
+        'critical' (bool): True when the total float is zero.
+    Args:
+        tasks (list): Scheduled task dicts ('start_date', 'end_date', 'duration', 'depends_on').
+        calendar (WorkCalendar): The working-day index for this plan.
+        project_start (datetime): The first working day of the project.
+        store (TaskStore, optional): The store returned by ``schedule_tasks``; built from
+            the tasks' dates when omitted (e.g. after an incremental reschedule).
+    Returns:
+        list: Ids of the critical tasks, ordered by start date.
+    """
+    n = len(tasks)
+    if n == 0:
+        return []
+    if store is None:
+        store = TaskStore.from_tasks(tasks)
+        store.start = np.array([t['start_date'].toordinal() for t in tasks], dtype=np.int64)
+        store.end = np.array([t['end_date'].toordinal() for t in tasks], dtype=np.int64)
+
+    working_days = np.array(calendar.working_ordinals(
+        project_start, datetime.fromordinal(int(store.end.max()))), dtype=np.int64)
+    early_start = np.searchsorted(working_days, store.start)
+    early_finish = np.searchsorted(working_days, store.end)
+    project_finish = int(early_finish.max())
+    order = np.argsort(-early_start, kind='stable').tolist()
+    succ_ptr, succ_idx, succ_lag = (a.tolist() for a in store.successor_csr())
+    early_start, early_finish = early_start.tolist(), early_finish.tolist()
+    # A task occupies at least its start day, like calendar.add_working_days
+    span = (np.maximum(store.durations, 1) - 1).tolist()
+
+    # Backward pass: latest finish, then total and free float
+    late_start = [0] * n
+    late_finish = [0] * n
+    for i in order:
+        finish = free_limit = project_finish
+        for k in range(succ_ptr[i], succ_ptr[i + 1]):
+            succ, lag = succ_idx[k], succ_lag[k]
+            finish = min(finish, late_start[succ] - 1 - lag)
+            free_limit = min(free_limit, early_start[succ] - 1 - lag)
+        late_finish[i] = finish
+        late_start[i] = finish - span[i]
+        task = tasks[i]
+        task['total_float'] = late_start[i] - early_start[i]
+        task['free_float'] = free_limit - early_finish[i]
+        task['critical'] = task['total_float'] == 0
+
+    working_days = working_days.tolist()
+    for i, task in enumerate(tasks):
+        task['late_start'] = datetime.fromordinal(working_days[late_start[i]])
+        task['late_finish'] = datetime.fromordinal(working_days[late_finish[i]])
+
+    return sorted((i for i in range(n) if tasks[i]['critical']), key=lambda i: (early_start[i], i))
+
+
+# --- Request Parsing ---
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Default tasks used when none are provided (for easier testing)
+DEFAULT_TASKS = [
+    {"name": "Riser Works", "duration": 8, "depends_on_index": None},
+    {"name": "Riser Pressure Test", "duration": 2, "depends_on_index": 0},
+    {"name": "Sprinkler Works", "duration": 10, "depends_on_index": 1},
+    {"name": "Sprinkler Pressure Test", "duration": 2, "depends_on_index": 2},
+    {"name": "Product Ex Work", "duration": 49, "depends_on_index": None},
+    {"name": "Shipped on Board", "duration": 18, "depends_on_index": 4},
+    {"name": "Vessel at Chittagong", "duration": 21, "depends_on_index": 5},
+    {"name": "Materials from port to site", "duration": 10, "depends_on_index": 6},
+    {"name": "Pump Room", "duration": 10, "depends_on_index": 7},
+    {"name": "Testing Commissioning & Balancing", "duration": 5, "depends_on_index": 8},
+]
+
+
+def parse_holidays(holidays_input):
+    """ Parses holiday payloads into [{'start', 'end', 'name', 'color'}, ...], skipping invalid entries. """
+    holidays = []
+    for holiday in holidays_input or []:
+        try:
+            holiday_start = datetime.strptime(holiday.get('start_date'), '%Y-%m-%d')
+            holiday_end = datetime.strptime(holiday.get('end_date'), '%Y-%m-%d')
+            # Ensure end date is not before start date
+            if holiday_end < holiday_start:
+                holiday_end = holiday_start # Treat as single day if invalid range
+            holidays.append({
+                'start': holiday_start,
+                'end': holiday_end,
+                'name': holiday.get('name', 'Holiday'),
+                'color': holiday.get('color', '#ff9999')
+            })
+        except (ValueError, TypeError, AttributeError) as e:
+            logging.warning(f"Skipping invalid holiday data: {holiday}. Error: {e}")
+            continue # Skip invalid holiday entries
+    return holidays
+
+
+def parse_weekly_holiday(value):
+    """
+    Normalises the weekly holiday setting: one day (0=Mon, ..., 6=Sun) or a list of days,
+    e.g. [4, 5] for a Friday + Saturday weekend.
+    Returns:
+        tuple: (int for one day or sorted list of ints, display name such as 'Friday & Saturday')
+    Raises:
+        ValueError: If a day is not an integer, or a list is empty or names a day outside 0-6.
+    """
+    if isinstance(value, (list, tuple)):
+        days = sorted({int(day) for day in value})
+        if not days:
+            raise ValueError("'weekly_holiday' must name at least one day")
+        if any(not 0 <= day <= 6 for day in days):
+            raise ValueError(f"Weekly holidays must be between 0 (Monday) and 6 (Sunday), got {days}")
+        if len(days) > 1:
+            return days, ' & '.join(DAY_NAMES[day] for day in days)
+        value = days[0]
+
+    weekly_holiday = int(value)
+    try:
+        weekly_holiday_name = DAY_NAMES[weekly_holiday]
+    except IndexError:
+        weekly_holiday_name = "Invalid Day" # Fallback
+    return weekly_holiday, weekly_holiday_name
+
+
+def parse_tasks(tasks_input):
+    """ Parses task payloads into task dicts (dates unset), falling back to DEFAULT_TASKS. """
+    if not tasks_input:
+        tasks_input = DEFAULT_TASKS
+
+    tasks = []
+    for i, task_data in enumerate(tasks_input):
+        name = task_data.get('name', f'Task {i+1}')
+        duration = int(task_data.get('duration', 1))
+        # Accepts the legacy 'depends_on_index' as well as a 'depends_on' list with lags
+        depends_on = parse_dependencies(task_data, name, len(tasks_input))
+
+        tasks.append({
+            'id': i, # Use index as ID for simplicity
+            'name': name,
+            'duration': duration,
+            'depends_on_index': depends_on[0][0] if depends_on else None,
+            'depends_on': depends_on, # [(predecessor_index, lag), ...]
+            'start_date': None, # To be calculated
+            'end_date': None    # To be calculated
+        })
+    return tasks
+
+
+def parse_plan(data, holidays=None):
+    """
+    Parses a timeline request payload into a plan.
+    Args:
+        data (dict): The JSON payload sent to /generate-timeline or /schedule.
+        holidays (list, optional): Already parsed holidays shared by several plans;
+            when given, the payload's own 'holidays' are ignored.
+    Returns:
+        dict: {'project_name', 'start_date', 'weekly_holiday', 'weekly_holiday_name', 'holidays',
+               'tasks', 'analyze_critical_path'}
+    Raises:
+        ValueError: If the start date or a task duration is malformed.
+    """
+    data = data or {}
+    start_date_str = data.get('start_date', datetime.now().strftime('%Y-%m-%d'))
+    # Default weekly holiday is Friday (4) if not provided by frontend
+    weekly_holiday, weekly_holiday_name = parse_weekly_holiday(data.get('weekly_holiday', 4))
+
+    return {
+        'project_name': data.get('project_name', 'Project Timeline'),
+        'start_date': datetime.strptime(start_date_str, '%Y-%m-%d'),
+        'weekly_holiday': weekly_holiday,
+        'weekly_holiday_name': weekly_holiday_name,
+        'holidays': holidays if holidays is not None else parse_holidays(data.get('holidays', [])),
+        'tasks': parse_tasks(data.get('tasks', [])),
+        # Adds CPM fields to the schedule and highlights critical tasks on the chart
+        'analyze_critical_path': bool(data.get('critical_path', False)),
+    }
+
+
+def plan_to_payload(plan):
+    """
+    The request payload of a parsed plan with every default resolved (start date,
+    weekly holiday, task list), so parsing it again gives the same plan on any day.
+    """
+    return {
+        'project_name': plan['project_name'],
+        'start_date': plan['start_date'].strftime('%Y-%m-%d'),
+        'weekly_holiday': plan['weekly_holiday'],
+        'holidays': [
+            {'name': h['name'], 'start_date': h['start'].strftime('%Y-%m-%d'),
+             'end_date': h['end'].strftime('%Y-%m-%d'), 'color': h['color']}
+            for h in plan['holidays']
+        ],
+        'tasks': [
+            {'name': t['name'], 'duration': t['duration'],
+             'depends_on': [{'index': dep, 'lag': lag} for dep, lag in t['depends_on']]}
+            for t in plan['tasks']
+        ],
+        'critical_path': plan['analyze_critical_path'],
+    }
+
+
+# --- Schedule Computation ---
+def compute_schedule(plan, calendar=None, timings=None):
+    """
+    Computes all task dates and the project summary for a parsed plan. No plotting.
+    Args:
+        plan (dict): A plan returned by ``parse_plan``.
+        calendar (WorkCalendar, optional): A prebuilt calendar to reuse.
+        timings (dict, optional): Receives the 'calendar' and 'schedule' phase times in seconds.
+    Returns:
+        dict: {'tasks', 'project_start', 'project_end', 'total_days', 'working_days'}
+    Raises:
+        CircularDependencyError: If the dependencies contain a cycle.
+    """
+    with timed(timings, 'calendar'):
+        if calendar is None:
+            calendar = get_work_calendar(plan['holidays'], plan['weekly_holiday'])
+    tasks = plan['tasks']
+
+    with timed(timings, 'schedule'):
+        # Find the actual project start date (first working day on or after requested start)
+        project_start = calendar.next_working_day(plan['start_date'])
+        store = schedule_tasks(tasks, calendar, project_start)
+        return _build_schedule(tasks, calendar, project_start, plan.get('analyze_critical_path', False), store)
+
+
+def _build_schedule(tasks, calendar, project_start, analyze=False, store=None):
+    """
+    Assembles the schedule dict (project end, calendar and working days) for dated tasks.
+    With ``analyze`` the tasks also get CPM fields and the dict a 'critical_path' id list;
+    ``store`` is the TaskStore the dates came from, if there is one.
+    """
+    if not tasks:
+        project_end = project_start # Handle case with no tasks
+    else:
+        project_end = max(t['end_date'] for t in tasks)
+
+    schedule = {
+        'tasks': tasks,
+        'project_start': project_start,
+        'project_end': project_end,
+        'total_days': (project_end - project_start).days + 1, # Calendar days
+        # Actual working days (excluding holidays AND weekly holiday)
+        'working_days': calendar.working_days_between(project_start, project_end),
+    }
+    if analyze:
+        schedule['critical_path'] = analyze_critical_path(tasks, calendar, project_start, store)
+    return schedule
+
+
+def schedule_summary(plan, schedule):
+    """ The JSON-serialisable project summary shared by every timeline endpoint. """
+    summary = {
+        'project_name': plan['project_name'],
+        'start_date': schedule['project_start'].strftime('%Y-%m-%d'), # Return actual start
+        'end_date': schedule['project_end'].strftime('%Y-%m-%d'),
+        'total_days': schedule['total_days'],
+        'working_days': schedule['working_days'],
+        'weekly_holiday': plan['weekly_holiday'], # Keep the integer value
+        'weekly_holiday_name': plan['weekly_holiday_name'],
+    }
+    if 'critical_path' in schedule:
+        summary['critical_path'] = schedule['critical_path']
+    return summary
+
+
+def task_to_json(task):
+    """ Serialises one scheduled task (with its CPM fields when they were computed). """
+    result = {
+        'id': task['id'],
+        'name': task['name'],
+        'duration': task['duration'],
+        'depends_on': [{'index': dep, 'lag': lag} for dep, lag in task['depends_on']],
+        'start_date': task['start_date'].strftime('%Y-%m-%d'),
+        'end_date': task['end_date'].strftime('%Y-%m-%d'),
+    }
+    if 'total_float' in task:
+        result.update({
+            'late_start': task['late_start'].strftime('%Y-%m-%d'),
+            'late_finish': task['late_finish'].strftime('%Y-%m-%d'),
+            'total_float': task['total_float'],
+            'free_float': task['free_float'],
+            'critical': task['critical'],
+        })
+    return result
+
+
+# --- Batch Scheduling ---
+def schedule_batch_chunk(items, calendar):
+    """
+    Schedules several plans against one shared calendar (runs in a worker process).
+    Args:
+        items (list): [(index, plan), ...]
+        calendar (WorkCalendar): The calendar shared by every plan in the batch.
+    Returns:
+        list: [(index, plan, schedule, error), ...] where exactly one of schedule/error is None.
+    """
+    results = []
+    for index, plan in items:
+        try:
+            results.append((index, plan, compute_schedule(plan, calendar), None))
+        except CircularDependencyError as ce:
+            results.append((index, plan, None, {'error': str(ce), 'cycle': ce.cycle}))
+        except ValueError as ve:
+            results.append((index, plan, None, {'error': f'Invalid input data: {ve}'}))
+    return results
+
+
+# --- Incremental Rescheduling ---
+def parse_prior_dates(prior_tasks, num_tasks):
+    """
+    Reads the task dates of a previous /schedule response.
+    Args:
+        prior_tasks (list): [{'id', 'start_date', 'end_date'}, ...] as returned by /schedule.
+        num_tasks (int): Number of tasks in the plan.
+    Returns:
+        list: [(start, end), ...] indexed by task id.
+    Raises:
+        ValueError: If any task is missing or has malformed dates.
+    """
+    dates = [None] * num_tasks
+    for entry in prior_tasks or []:
+        task_id = int(entry['id'])
+        if 0 <= task_id < num_tasks:
+            dates[task_id] = (datetime.strptime(entry['start_date'], '%Y-%m-%d'),
+                              datetime.strptime(entry['end_date'], '%Y-%m-%d'))
+    missing = [i for i, d in enumerate(dates) if d is None]
+    if missing:
+        raise ValueError(f"Prior schedule has no dates for task(s) {missing[:10]}")
+    return dates
+
+
+def apply_changes(plan, changes):
+    """
+    Applies an edit list to a parsed plan in place.
+    Supported changes:
+        {"type": "duration", "task": i, "duration": n}
+        {"type": "add_dependency", "task": i, "depends_on": j, "lag": n}
+        {"type": "remove_dependency", "task": i, "depends_on": j}
+        {"type": "add_holiday", "holiday": {"name", "start_date", "end_date", "color"}}
+    Returns:
+        tuple: (set of directly edited task ids, list of added holiday dicts)
+    Raises:
+        ValueError: If a change is malformed or refers to an unknown task.
+    """
+    tasks = plan['tasks']
+    edited, added_holidays = set(), []
+
+    def task_index(value):
+        index = int(value)
+        if not (0 <= index < len(tasks)):
+            raise ValueError(f"Change refers to unknown task index {index}")
+        return index
+
+    for change in changes or []:
+        kind = change.get('type')
+        if kind == 'duration':
+            i = task_index(change.get('task'))
+            tasks[i]['duration'] = int(change.get('duration'))
+            edited.add(i)
+        elif kind in ('add_dependency', 'remove_dependency'):
+            i = task_index(change.get('task'))
+            dep = task_index(change.get('depends_on'))
+            deps = [(d, lag) for d, lag in tasks[i]['depends_on'] if d != dep]
+            if kind == 'add_dependency':
+                deps.append((dep, max(0, int(change.get('lag', 0) or 0))))
+            tasks[i]['depends_on'] = deps
+            tasks[i]['depends_on_index'] = deps[0][0] if deps else None
+            edited.add(i)
+        elif kind == 'add_holiday':
+            parsed = parse_holidays([change.get('holiday')])
+            if not parsed:
+                raise ValueError(f"Invalid holiday in change: {change.get('holiday')}")
+            plan['holidays'].extend(parsed)
+            added_holidays.extend(parsed)
+        else:
+            raise ValueError(f"Unsupported change type '{kind}'")
+    return edited, added_holidays
+
+
+def _holiday_seeds(tasks, prior_dates, plan_start, holidays):
+    """
+    Tasks whose dates may move because of new holidays: those whose calendar window
+    (from the day after their earliest predecessor ends, or the requested project start,
+    through their old end date) overlaps a holiday. Uses date comparisons only.
+    """
+    seeds = set()
+    for task in tasks:
+        i = task['id']
+        if task['depends_on']:
+            window_start = min(prior_dates[d][1] for d, _ in task['depends_on']) + timedelta(days=1)
+        else:
+            window_start = plan_start
+        window_end = prior_dates[i][1]
+        if any(h['start'] <= window_end and h['end'] >= window_start for h in holidays):
+            seeds.add(i)
+    return seeds
+
+
+def reschedule_incremental(plan, prior_dates, edited, added_holidays=(), calendar=None):
+    """
+    Recomputes only the tasks downstream of an edit, reusing prior dates everywhere else.
+    Successors of an edited task are visited in topological order, but a task's dates are
+    only recalculated when it was edited or one of its predecessors actually moved.
+    Args:
+        plan (dict): The plan with the changes already applied (see ``apply_changes``).
+        prior_dates (list): [(start, end), ...] from the previous schedule.
+        edited (set): Ids of tasks whose duration or dependencies changed.
+        added_holidays (list): Holidays added since the previous schedule.
+        calendar (WorkCalendar, optional): A prebuilt calendar for the updated holidays.
+    Returns:
+        tuple: (schedule dict as from ``compute_schedule``, sorted list of changed task ids)
+    Raises:
+        CircularDependencyError: If an added dependency closes a cycle.
+    """
+    if calendar is None:
+        calendar = get_work_calendar(plan['holidays'], plan['weekly_holiday'])
+    tasks = plan['tasks']
+    project_start = calendar.next_working_day(plan['start_date'])
+
+    seeds = set(edited)
+    if added_holidays:
+        seeds |= _holiday_seeds(tasks, prior_dates, plan['start_date'], added_holidays)
+
+    # Everything reachable from a seed may move; nothing else can
+    successors = _successor_lists(tasks)
+    affected, stack = set(seeds), list(seeds)
+    while stack:
+        for succ, _ in successors[stack.pop()]:
+            if succ not in affected:
+                affected.add(succ)
+                stack.append(succ)
+
+    dates = list(prior_dates)
+    changed = set()
+    indegree = {i: sum(1 for d, _ in tasks[i]['depends_on'] if d in affected) for i in affected}
+    queue = deque(i for i in affected if indegree[i] == 0)
+    processed = 0
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+
+    while queue:
+        i = queue.popleft()
+        task = tasks[i]
+        processed += 1
+        if i in seeds or any(d in changed for d, _ in task['depends_on']):
+            if task['depends_on']:
+                start = max(_successor_start(calendar, dates[d][1], lag) for d, lag in task['depends_on'])
+            else:
+                start = project_start
+            end = calendar.add_working_days(start, task['duration'])
+            if (start, end) != prior_dates[i]:
+                dates[i] = (start, end)
+                changed.add(i)
+            if debug:
+                logging.debug(f"Rescheduled task '{task['name']}': {start.strftime('%Y-%m-%d')} -> {end.strftime('%Y-%m-%d')}")
+
+        for succ, _ in successors[i]:
+            if succ in affected:
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    queue.append(succ)
+
+    if processed < len(affected):
+        remaining = {i for i in affected if indegree[i] > 0}
+        cycle = _find_cycle(tasks, remaining)
+        raise CircularDependencyError(cycle, [tasks[i]['name'] for i in cycle])
+
+    for task in tasks:
+        task['start_date'], task['end_date'] = dates[task['id']]
+    # Edited tasks are reported even if their dates happen to stay the same
+    schedule = _build_schedule(tasks, calendar, project_start, plan.get('analyze_critical_path', False))
+    return schedule, sorted(changed | set(edited))
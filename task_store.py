@@ -0,0 +1,108 @@
+import sys
+
+import numpy as np
+
+
+# --- Compact Task Store ---
+class TaskStore:
+    """
+    Column-oriented view of a task list for scheduling large plans.
+
+    Durations live in one NumPy array and predecessors in CSR form
+    (``pred_ptr[i]:pred_ptr[i+1]`` slices ``pred_idx`` / ``pred_lag``), names in an
+    interned list, and scheduled dates as integer day ordinals. Nothing here holds a
+    dict or datetime per task; ``scheduler`` converts at the edges.
+    """
+
+    __slots__ = ('names', 'durations', 'pred_ptr', 'pred_idx', 'pred_lag', 'start', 'end')
+
+    def __init__(self, names, durations, pred_ptr, pred_idx, pred_lag):
+        """
+        Args:
+            names (list): Task names.
+            durations (sequence): Working days per task.
+            pred_ptr (sequence): CSR row pointers, length ``len(names) + 1``.
+            pred_idx (sequence): Predecessor indexes, grouped by task.
+            pred_lag (sequence): Finish-to-start lag for each entry of ``pred_idx``.
+        """
+        self.names = names
+        self.durations = np.asarray(durations, dtype=np.int64)
+        self.pred_ptr = np.asarray(pred_ptr, dtype=np.int64)
+        self.pred_idx = np.asarray(pred_idx, dtype=np.int64)
+        self.pred_lag = np.asarray(pred_lag, dtype=np.int64)
+        self.start = None # int64 ordinals, set by schedule()
+        self.end = None
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_tasks(cls, tasks):
+        """ Builds a store from parsed task dicts ('name', 'duration', 'depends_on' [(index, lag), ...]). """
+        names, durations, pred_ptr, pred_idx, pred_lag = [], [], [0], [], []
+        for task in tasks:
+            name = task['name']
+            names.append(sys.intern(name) if isinstance(name, str) else name)
+            durations.append(task['duration'])
+            for dep, lag in task['depends_on']:
+                pred_idx.append(dep)
+                pred_lag.append(lag)
+            pred_ptr.append(len(pred_idx))
+        return cls(names, durations, pred_ptr, pred_idx, pred_lag)
+
+    def predecessors(self, i):
+        """ Predecessor indexes of task ``i``. """
+        return self.pred_idx[self.pred_ptr[i]:self.pred_ptr[i + 1]].tolist()
+
+    def successor_csr(self):
+        """ The transposed adjacency: (succ_ptr, succ_idx, succ_lag) arrays. """
+        n = len(self)
+        owner = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.pred_ptr))
+        by_predecessor = np.argsort(self.pred_idx, kind='stable')
+        succ_ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.pred_idx, minlength=n), out=succ_ptr[1:])
+        return succ_ptr, owner[by_predecessor], self.pred_lag[by_predecessor]
+
+    def schedule(self, calendar, project_start):
+        """
+        Forward pass over working-day indices (0 = ``project_start``), then one table
+        lookup per task to turn indices into ordinals. Same rules as ``schedule_tasks``:
+        a task spans max(duration, 1) working days and a successor starts ``lag + 1``
+        working days after its predecessor's last day.
+        Args:
+            calendar (WorkCalendar): The working-day index for this plan.
+            project_start (datetime): The first working day of the project.
+        Returns:
+            list: Task ids in the order they were scheduled. Shorter than the store when
+            the dependencies contain a cycle; ``start``/``end`` are then left unset.
+        """
+        n = len(self)
+        succ_ptr, succ_idx, succ_lag = (a.tolist() for a in self.successor_csr())
+        span = (np.maximum(self.durations, 1) - 1).tolist()
+        indegree = np.diff(self.pred_ptr).tolist()
+
+        # Plain lists beat NumPy scalar indexing in this per-edge loop
+        early_start = [0] * n
+        order = [i for i in range(n) if indegree[i] == 0]
+        for i in order: # The list grows while it is walked
+            next_free = early_start[i] + span[i] + 1
+            for k in range(succ_ptr[i], succ_ptr[i + 1]):
+                succ = succ_idx[k]
+                candidate = next_free + succ_lag[k]
+                if candidate > early_start[succ]:
+                    early_start[succ] = candidate
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    order.append(succ)
+        if len(order) < n or n == 0:
+            return order
+
+        early_start = np.array(early_start, dtype=np.int64)
+        early_finish = early_start + np.maximum(self.durations, 1) - 1
+        last = int(early_finish.max())
+        working_days = np.array(calendar.working_ordinals(
+            project_start, calendar.add_working_days(project_start, last + 1)), dtype=np.int64)
+        self.start = working_days[early_start]
+        self.end = working_days[early_finish]
+        return order
+
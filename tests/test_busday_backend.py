@@ -0,0 +1,91 @@
+"""
+Property test: the NumPy busday backend schedules exactly like the default index backend.
+"""
+import copy
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import numpy as np  # noqa: E402
+
+import scheduler  # noqa: E402
+from app import calculate_end_date  # noqa: E402
+from busday_backend import busday_calendar, end_dates  # noqa: E402
+from plan_generator import generate_plan  # noqa: E402
+from work_calendar import WorkCalendar  # noqa: E402
+
+CASES = 300
+
+
+def random_payload(rng, seed):
+    """ A generated plan with lags, some durations <= 0 and often a start on a holiday. """
+    weekly_holiday = rng.choice([rng.randint(0, 6), sorted(rng.sample(range(7), rng.randint(2, 3)))])
+    payload = generate_plan(rng.randint(1, 60), rng.uniform(0, 2.5), rng.randint(1, 10), rng.randint(0, 8),
+                            rng.randint(20, 200), weekly_holiday=weekly_holiday, seed=seed)
+    for task in payload['tasks']:
+        if rng.random() < 0.1:
+            task['duration'] = rng.choice([0, -1])
+    if payload['holidays'] and rng.random() < 0.4:
+        payload['start_date'] = rng.choice(payload['holidays'])['start_date']
+    elif rng.random() < 0.3:
+        # Move the start onto a weekly off day
+        start = datetime.strptime(payload['start_date'], '%Y-%m-%d')
+        off = weekly_holiday if isinstance(weekly_holiday, int) else weekly_holiday[0]
+        payload['start_date'] = (start + timedelta(days=(off - start.weekday()) % 7)).strftime('%Y-%m-%d')
+    return payload
+
+
+def schedule_with(monkeypatch, backend, payload):
+    monkeypatch.setattr(scheduler, 'SCHEDULER_BACKEND', backend)
+    schedule = scheduler.compute_schedule(scheduler.parse_plan(copy.deepcopy(payload)))
+    return schedule, [(t['start_date'], t['end_date']) for t in schedule['tasks']]
+
+
+def test_busday_matches_index_backend(monkeypatch):
+    rng = random.Random(1616)
+    for case in range(CASES):
+        payload = random_payload(rng, case)
+        index_schedule, index_dates = schedule_with(monkeypatch, 'index', payload)
+        busday_schedule, busday_dates = schedule_with(monkeypatch, 'busday', payload)
+        context = (case, payload['start_date'], payload['weekly_holiday'])
+        assert busday_dates == index_dates, context
+        for key in ('project_start', 'project_end', 'working_days'):
+            assert busday_schedule[key] == index_schedule[key], (key, context)
+
+
+def test_end_dates_match_calculate_end_date():
+    """ Scheduled tasks always start on working days, so check holiday starts directly. """
+    rng = random.Random(2024)
+    for case in range(CASES):
+        payload = random_payload(rng, case)
+        plan = scheduler.parse_plan(payload)
+        holidays, weekly_holiday = plan['holidays'], plan['weekly_holiday']
+        base = plan['start_date']
+        starts = [base + timedelta(days=rng.randint(-3, 120)) for _ in range(20)]
+        starts += [h['start'] + timedelta(days=rng.randint(0, (h['end'] - h['start']).days)) for h in holidays]
+        durations = [rng.randint(-1, 25) for _ in starts]
+
+        busdaycal = busday_calendar(WorkCalendar(holidays, weekly_holiday))
+        ends = end_dates(np.array([d.date() for d in starts], dtype='datetime64[D]'),
+                         np.array(durations, dtype=np.int64), busdaycal)
+        expected = [calculate_end_date(start, duration, holidays, weekly_holiday)
+                    for start, duration in zip(starts, durations)]
+        assert [end.astype(datetime) for end in ends] == [e.date() for e in expected], (case, weekly_holiday)
+
+
+def test_busday_reports_cycles(monkeypatch):
+    payload = {'start_date': '2025-01-06', 'tasks': [
+        {'name': 'A', 'duration': 2, 'depends_on': [1]},
+        {'name': 'B', 'duration': 1, 'depends_on': [0]},
+    ]}
+    monkeypatch.setattr(scheduler, 'SCHEDULER_BACKEND', 'busday')
+    with pytest.raises(scheduler.CircularDependencyError) as excinfo:
+        scheduler.compute_schedule(scheduler.parse_plan(payload))
+    assert set(excinfo.value.cycle) == {0, 1}
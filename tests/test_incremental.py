@@ -0,0 +1,70 @@
+"""
+Property test: reschedule_incremental gives the same schedule as a full recompute.
+"""
+import copy
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from plan_generator import generate_plan  # noqa: E402
+from scheduler import apply_changes, compute_schedule, parse_plan, reschedule_incremental  # noqa: E402
+
+CASES = 600
+
+
+def random_changes(rng, payload):
+    """ A few duration, dependency and holiday edits that keep the plan acyclic. """
+    tasks = payload['tasks']
+    start = datetime.strptime(payload['start_date'], '%Y-%m-%d')
+    changes = []
+    for _ in range(rng.randint(1, 4)):
+        i = rng.randrange(len(tasks))
+        kind = rng.choice(['duration', 'add_dependency', 'remove_dependency', 'add_holiday'])
+        if kind == 'duration':
+            changes.append({'type': 'duration', 'task': i, 'duration': rng.randint(-1, 30)})
+        elif kind == 'add_dependency' and i > 0:
+            # Generated plans only depend on earlier tasks, so this cannot close a cycle
+            changes.append({'type': 'add_dependency', 'task': i, 'depends_on': rng.randrange(i),
+                            'lag': rng.choice([0, 0, 1, 3])})
+        elif kind == 'remove_dependency' and tasks[i]['depends_on']:
+            changes.append({'type': 'remove_dependency', 'task': i,
+                            'depends_on': rng.choice(tasks[i]['depends_on'])['index']})
+        elif kind == 'add_holiday':
+            day = start + timedelta(days=rng.randint(-3, 150))
+            changes.append({'type': 'add_holiday', 'holiday': {
+                'name': 'Added', 'start_date': day.strftime('%Y-%m-%d'),
+                'end_date': (day + timedelta(days=rng.randint(0, 6))).strftime('%Y-%m-%d')}})
+    return changes
+
+
+def test_incremental_matches_full_recompute():
+    rng = random.Random(909)
+    for case in range(CASES):
+        payload = generate_plan(rng.randint(1, 40), rng.uniform(0, 2.5), rng.randint(1, 8), rng.randint(0, 6),
+                                rng.randint(20, 150), weekly_holiday=rng.choice([4, 6, [4, 5], [5, 6]]), seed=case)
+        payload['critical_path'] = rng.random() < 0.3
+        changes = random_changes(rng, payload)
+
+        prior = compute_schedule(parse_plan(copy.deepcopy(payload)))
+        prior_dates = [(t['start_date'], t['end_date']) for t in prior['tasks']]
+
+        plan = parse_plan(copy.deepcopy(payload))
+        edited, added_holidays = apply_changes(plan, changes)
+        schedule, changed_ids = reschedule_incremental(plan, prior_dates, edited, added_holidays)
+
+        full_plan = parse_plan(copy.deepcopy(payload))
+        apply_changes(full_plan, changes)
+        full = compute_schedule(full_plan)
+
+        context = (case, changes)
+        for key in ('project_start', 'project_end', 'total_days', 'working_days', 'critical_path'):
+            assert schedule.get(key) == full.get(key), (key, context)
+        full_dates = [(t['start_date'], t['end_date']) for t in full['tasks']]
+        assert [(t['start_date'], t['end_date']) for t in schedule['tasks']] == full_dates, context
+        moved = {i for i, dates in enumerate(full_dates) if dates != prior_dates[i]}
+        assert moved <= set(changed_ids), (moved - set(changed_ids), context)
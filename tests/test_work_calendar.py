@@ -0,0 +1,92 @@
+"""
+Property test: WorkCalendar gives the same answers as the day-by-day helpers it replaced.
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import calculate_end_date, find_next_working_day  # noqa: E402
+from scheduler import parse_holidays  # noqa: E402
+from work_calendar import WorkCalendar, get_work_calendar  # noqa: E402
+
+CASES = 3000
+BASE = datetime(2025, 1, 1)
+
+
+def count_working_days(start, end, holidays, weekly_holiday):
+    """ The working-day count loop /generate-timeline used before WorkCalendar. """
+    weekly_off = {weekly_holiday} if isinstance(weekly_holiday, int) else set(weekly_holiday)
+    working_days = 0
+    current = start
+    while current <= end:
+        is_holiday = any(h['start'] <= current <= h['end'] for h in holidays)
+        is_weekly_off = current.weekday() in weekly_off
+        if not is_holiday and not is_weekly_off:
+            working_days += 1
+        current += timedelta(days=1)
+    return working_days
+
+
+def random_holidays(rng):
+    """ Holiday payloads with overlapping, adjacent and reversed (end before start) ranges. """
+    payload = []
+    for _ in range(rng.randint(0, 8)):
+        start = BASE + timedelta(days=rng.randint(-10, 120))
+        end = start + timedelta(days=rng.randint(-3, 12))
+        payload.append({'start_date': start.strftime('%Y-%m-%d'), 'end_date': end.strftime('%Y-%m-%d')})
+    return parse_holidays(payload)
+
+
+def random_weekly_holiday(rng):
+    """ One weekly day off, or a list of two or three (e.g. a Friday + Saturday weekend). """
+    if rng.random() < 0.6:
+        return rng.randint(0, 6)
+    return sorted(rng.sample(range(7), rng.randint(2, 3)))
+
+
+def random_start(rng, holidays, weekly_holiday):
+    """ A start day, biased towards holidays and weekly off days. """
+    roll = rng.random()
+    if roll < 0.25 and holidays:
+        h = rng.choice(holidays)
+        return h['start'] + timedelta(days=rng.randint(0, (h['end'] - h['start']).days))
+    day = BASE + timedelta(days=rng.randint(-5, 120))
+    if roll < 0.5:
+        off = weekly_holiday if isinstance(weekly_holiday, int) else rng.choice(weekly_holiday)
+        day += timedelta(days=(off - day.weekday()) % 7)
+    return day
+
+
+def test_matches_day_by_day_helpers():
+    rng = random.Random(20250101)
+    for _ in range(CASES):
+        holidays = random_holidays(rng)
+        weekly_holiday = random_weekly_holiday(rng)
+        calendar = WorkCalendar(holidays, weekly_holiday)
+        start = random_start(rng, holidays, weekly_holiday)
+        duration = rng.randint(-2, 40)
+        context = (start, duration, holidays, weekly_holiday)
+
+        assert calendar.add_working_days(start, duration) == \
+            calculate_end_date(start, duration, holidays, weekly_holiday), context
+        assert calendar.next_working_day(start) == \
+            find_next_working_day(start, holidays, weekly_holiday), context
+
+        end = start + timedelta(days=rng.randint(-5, 60))
+        assert calendar.working_days_between(start, end) == \
+            count_working_days(start, end, holidays, weekly_holiday), (context, end)
+
+
+def test_cached_calendar_matches_fresh_one():
+    rng = random.Random(7)
+    for _ in range(200):
+        holidays = random_holidays(rng)
+        weekly_holiday = random_weekly_holiday(rng)
+        fresh = WorkCalendar(holidays, weekly_holiday)
+        cached = get_work_calendar(holidays, weekly_holiday)
+        start = random_start(rng, holidays, weekly_holiday)
+        duration = rng.randint(0, 40)
+        assert cached.add_working_days(start, duration) == fresh.add_working_days(start, duration)
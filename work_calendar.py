@@ -0,0 +1,170 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from functools import lru_cache
+
+
+# --- Working-Day Calendar Index ---
+class WorkCalendar:
+    """
+    Precomputed index of working days for a holiday list and weekly off day(s).
+
+    Dates are handled as proleptic Gregorian ordinals (``date.toordinal()``).
+    Holiday ranges are merged into sorted, non-overlapping intervals and the
+    number of weekly-working days each interval removes is kept as a prefix
+    sum, so the working-day count up to any date is a closed-form weekday count
+    minus one binary search over the holidays.
+
+    This gives the same answers as stepping one calendar day at a time through
+    ``calculate_end_date`` / ``find_next_working_day``, in O(log n) per query.
+    """
+
+    def __init__(self, holidays, weekly_holiday):
+        """
+        Args:
+            holidays (list): A list of holiday dictionaries [{'start': dt, 'end': dt}, ...].
+            weekly_holiday (int | iterable): Day(s) of the week to skip (0=Monday, 6=Sunday).
+        """
+        if isinstance(weekly_holiday, int):
+            weekly_off = {weekly_holiday}
+        else:
+            weekly_off = {int(d) for d in weekly_holiday}
+        self.weekly_off = frozenset(weekly_off)
+
+        # Working weekdays in the first r days of a week-aligned block of ordinals.
+        # Ordinal 0 is a Sunday, so ordinal o falls on weekday (o + 6) % 7.
+        self._week_prefix = [0] * 8
+        for r in range(7):
+            is_on = ((r + 6) % 7) not in self.weekly_off
+            self._week_prefix[r + 1] = self._week_prefix[r] + (1 if is_on else 0)
+        self._per_week = self._week_prefix[7]
+        if self._per_week == 0:
+            raise ValueError("Weekly holidays cover the whole week; no working days are left.")
+
+        # Merge holiday ranges into sorted, disjoint [start, end] ordinal intervals
+        ranges = sorted((h['start'].toordinal(), h['end'].toordinal()) for h in holidays)
+        merged = []
+        for start, end in ranges:
+            if end < start:
+                end = start
+            if merged and start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1][1] = end
+            else:
+                merged.append([start, end])
+
+        self._starts = [s for s, _ in merged]
+        self._ends = [e for _, e in merged]
+        # _removed[i] = weekly-working days swallowed by intervals [0, i)
+        self._removed = [0]
+        for s, e in merged:
+            self._removed.append(self._removed[-1] + self._weekly_count(e + 1) - self._weekly_count(s))
+        self._holiday_days = sum(e - s + 1 for s, e in merged)
+
+    # --- Internal counting helpers (ordinals) ---
+    def _weekly_count(self, x):
+        """ Number of days in [0, x) that are not a weekly off day. """
+        weeks, rem = divmod(x, 7)
+        return weeks * self._per_week + self._week_prefix[rem]
+
+    def _count_before(self, x):
+        """ Number of working days in [0, x). """
+        total = self._weekly_count(x)
+        i = bisect_left(self._starts, x)  # intervals starting before x
+        if i == 0:
+            return total
+        last = i - 1
+        covered = self._removed[last]
+        covered += self._weekly_count(min(self._ends[last] + 1, x)) - self._weekly_count(self._starts[last])
+        return total - covered
+
+    def _is_working_ordinal(self, o):
+        if (o + 6) % 7 in self.weekly_off:
+            return False
+        i = bisect_right(self._starts, o) - 1
+        return not (i >= 0 and self._ends[i] >= o)
+
+    def _add_working_ordinal(self, start, n):
+        """ Smallest ordinal d >= start with n working days in [start, d]. """
+        target = self._count_before(start) + n
+        lo = start
+        # Every week has at least one working day, so this bound is always enough
+        hi = start + 7 * n + self._holiday_days + 7
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._count_before(mid + 1) >= target:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    # --- Public API (datetimes) ---
+    def is_working_day(self, day):
+        """ True if ``day`` is neither a holiday nor a weekly off day. """
+        return self._is_working_ordinal(day.toordinal())
+
+    def add_working_days(self, start, duration):
+        """
+        Calculates the end date for a task that starts on ``start``.
+        Same semantics as ``calculate_end_date``: the start day counts as day 1
+        when it is a working day, and a duration <= 0 returns ``start``.
+        Args:
+            start (datetime): The start date of the task.
+            duration (int): The duration of the task in working days.
+        Returns:
+            datetime: The calculated end date.
+        """
+        if duration <= 0:
+            return start
+        return datetime.fromordinal(self._add_working_ordinal(start.toordinal(), duration))
+
+    def next_working_day(self, start_date):
+        """ Finds the next valid working day starting from start_date (inclusive). """
+        return datetime.fromordinal(self._add_working_ordinal(start_date.toordinal(), 1))
+
+    def holiday_ranges(self):
+        """ The merged holiday intervals as a tuple of inclusive (start, end) ordinal pairs. """
+        return tuple(zip(self._starts, self._ends))
+
+    def working_ordinals(self, start, end):
+        """ Ordinals of every working day in [start, end], in order. O(end - start). """
+        o, last = start.toordinal(), end.toordinal()
+        i = bisect_left(self._ends, o)  # First holiday interval that is not over by ``o``
+        result = []
+        while o <= last:
+            if i < len(self._starts) and self._starts[i] <= o:
+                o = self._ends[i] + 1  # Jump over the holiday
+                i += 1
+                continue
+            stop = min(last, self._starts[i] - 1) if i < len(self._starts) else last
+            result.extend(d for d in range(o, stop + 1) if (d + 6) % 7 not in self.weekly_off)
+            o = stop + 1
+        return result
+
+    def working_days_between(self, start, end):
+        """ Number of working days in the inclusive range [start, end] (0 if end < start). """
+        a, b = start.toordinal(), end.toordinal()
+        if b < a:
+            return 0
+        return self._count_before(b + 1) - self._count_before(a)
+
+
+@lru_cache(maxsize=64)
+def _cached_calendar(holiday_ranges, weekly_off):
+    return WorkCalendar(
+        [{'start': datetime.fromordinal(s), 'end': datetime.fromordinal(e)} for s, e in holiday_ranges],
+        weekly_off,
+    )
+
+
+def get_work_calendar(holidays, weekly_holiday):
+    """
+    Returns a (shared) WorkCalendar for the given holidays and weekly holiday.
+    Calendars are cached by their holiday ranges, so repeated requests with
+    the same calendar skip the index build entirely.
+    """
+    if isinstance(weekly_holiday, int):
+        weekly_off = frozenset([weekly_holiday])
+    else:
+        weekly_off = frozenset(int(d) for d in weekly_holiday)
+    holiday_ranges = tuple(sorted((h['start'].toordinal(), h['end'].toordinal()) for h in holidays))
+    return _cached_calendar(holiday_ranges, weekly_off)